@@ -0,0 +1,42 @@
+"""Measure counting and aggregating records against decoding them all."""
+
+import os
+
+from common import measure, report
+from makeweb import DictDB
+
+RECORDS = 2000
+FILENAME = "bench_aggregate.db"
+
+
+def main():
+    db = DictDB(FILENAME, flush_every=None)
+    orders = db.collection("orders")
+    with db.batch():
+        for n in range(RECORDS):
+            orders[n] = {
+                "customer": f"customer {n % 50}",
+                "city": ("oslo", "rome", "lima")[n % 3],
+                "items": [{"sku": n % 97, "qty": 1 + n % 4}] * 3,
+                "total": n % 200 / 4,
+            }
+
+    def decode_all():
+        return sum(order["total"] for order in orders.values())
+
+    def values_count():
+        return len(list(orders.values()))
+
+    report(f"count() x{RECORDS}", *measure(orders.count, 10))
+    report(f"len(values()) x{RECORDS}", *measure(values_count, 10))
+    report("sum via values()", *measure(decode_all, 10))
+    report("aggregate('total')", *measure(lambda: orders.aggregate("total"), 10))
+    report(
+        "aggregate('total', group_by='city')",
+        *measure(lambda: orders.aggregate("total", group_by="city"), 10),
+    )
+    db.close()
+    os.remove(FILENAME)
+
+
+main()
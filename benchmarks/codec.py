@@ -0,0 +1,38 @@
+"""Measure value codec throughput and encoded size for example records."""
+
+from common import measure, report
+from makeweb import BinaryCodec, JSONCodec
+
+RECORDS = 1000
+SHAPES = {
+    "todo": {"text": "Buy milk and eggs", "completed": False},
+    "guestbook": {
+        "name": "Ada",
+        "message": "Lovely little site, thanks for sharing it!",
+        "timestamp": 1700000000.25,
+    },
+    "counter": 1234,
+}
+
+
+def main():
+    for codec in (JSONCodec(), BinaryCodec()):
+        codec_name = codec.__class__.__name__
+        for shape, value in SHAPES.items():
+            raw = codec.encode(value)
+
+            def encode():
+                for _ in range(RECORDS):
+                    codec.encode(value)
+
+            def decode():
+                for _ in range(RECORDS):
+                    codec.decode(raw)
+
+            name = f"{codec_name} {shape}"
+            report(f"{name} encode x{RECORDS}", *measure(encode))
+            report(f"{name} decode x{RECORDS}", *measure(decode))
+            print(f"{name} size: {len(raw)} bytes")
+
+
+main()
@@ -0,0 +1,67 @@
+"""
+Shared helpers for the MakeWeb benchmarks.
+
+The benchmarks run under both the `makeweb` binary (MicroPython) and CPython,
+so timing and allocation tracking use whatever the running port provides.
+"""
+
+import gc
+import sys
+import time
+
+sys.path.append(".")
+
+try:
+    import tracemalloc
+except ImportError:
+    tracemalloc = None
+
+
+def now_ms():
+    if hasattr(time, "ticks_us"):
+        return time.ticks_us() / 1000
+    return time.perf_counter() * 1000
+
+
+def measure(func, repeat=1):
+    """Run func repeat times and return (ms per run, bytes allocated per run)."""
+    gc.collect()
+    if tracemalloc:
+        tracemalloc.start()
+    else:
+        gc.disable()
+        before = gc.mem_alloc()
+    start = now_ms()
+    for _ in range(repeat):
+        func()
+    elapsed = now_ms() - start
+    if tracemalloc:
+        allocated = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    else:
+        allocated = gc.mem_alloc() - before
+        gc.enable()
+        allocated //= repeat
+    gc.collect()
+    return elapsed / repeat, allocated
+
+
+def retained(build):
+    """Call build() and return (result, bytes still allocated for it)."""
+    gc.collect()
+    if tracemalloc:
+        tracemalloc.start()
+        result = build()
+        gc.collect()
+        size = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+    else:
+        before = gc.mem_alloc()
+        result = build()
+        gc.collect()
+        size = gc.mem_alloc() - before
+    return result, size
+
+
+def report(name, ms, allocated):
+    print(f"{name:<40} {ms:>10.2f} ms {allocated / 1024:>10.1f} KiB")
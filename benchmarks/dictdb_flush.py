@@ -0,0 +1,50 @@
+"""Measure DictDB inserts under each flush policy and with transactions."""
+
+import os
+
+from common import measure, report
+from makeweb import DictDB
+
+INSERTS = 10000
+FILENAME = "bench_flush.db"
+
+
+def run(name, insert, **policy):
+    db = DictDB(FILENAME, **policy)
+
+    def bench():
+        insert(db)
+        db.commit()
+
+    ms, allocated = measure(bench)
+    report(f"{name} ({INSERTS * 1000 / ms:.0f}/s)", ms, allocated)
+    db.close()
+    os.remove(FILENAME)
+
+
+def each(db):
+    for i in range(INSERTS):
+        db[f"{i:06d}"] = {"n": i}
+
+
+def batched(db):
+    with db.batch():
+        each(db)
+
+
+def transactions(db):
+    for i in range(INSERTS):
+        with db.transaction():
+            db[f"{i:06d}"] = {"n": i}
+
+
+def main():
+    run("write-through", each)
+    run("every 100 writes", each, flush_every=100)
+    run("every 100 ms", each, flush_every=None, flush_ms=100)
+    run("on commit", each, flush_every=None)
+    run("batch()", batched)
+    run("transaction per insert", transactions)
+
+
+main()
@@ -0,0 +1,36 @@
+"""Measure the cost of escaping text and attributes in a large table."""
+
+from common import measure, report
+from makeweb.html import Html, Markup, escape
+
+ROWS = 2000
+CLEAN = [(f"Row {i}", f"cell-{i % 7}", f"value {i * 3}") for i in range(ROWS)]
+DIRTY = [(f"<Row {i}>", f"cell & {i % 7}", f'"value" {i}') for i in range(ROWS)]
+TRUSTED = [tuple(Markup(cell) for cell in row) for row in CLEAN]
+
+
+def table(rows):
+    doc = Html()
+    with doc.table():
+        for name, kind, value in rows:
+            with doc.tr(cls=kind):
+                doc.td(name)
+                doc.td(value)
+    return doc.render()
+
+
+def escape_all(rows):
+    for row in rows:
+        for cell in row:
+            escape(cell)
+
+
+def main():
+    report("escape() clean cells", *measure(lambda: escape_all(CLEAN), 10))
+    report("escape() dirty cells", *measure(lambda: escape_all(DIRTY), 10))
+    report("table of Markup (no escaping)", *measure(lambda: table(TRUSTED), 5))
+    report("table of clean text", *measure(lambda: table(CLEAN), 5))
+    report("table of dirty text", *measure(lambda: table(DIRTY), 5))
+
+
+main()
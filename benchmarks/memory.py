@@ -0,0 +1,62 @@
+"""Measure heap bytes per node for a large table document."""
+
+from common import retained
+from makeweb.html import Html
+
+ROWS = 5000
+
+
+class LegacyTextNode:
+    def __init__(self, text):
+        self.text = text
+
+
+class LegacyElement:
+    """The previous node layout: a __dict__ per element and text wrappers."""
+
+    def __init__(self, tag, parent=None, **attrs):
+        self.tag = tag
+        self.parent = parent
+        self.children = []
+        self.attrs = dict(attrs)
+        self.html = None
+
+    def add(self, tag, text=None, **attrs):
+        element = LegacyElement(tag, self, **attrs)
+        self.children.append(element)
+        if text is not None:
+            element.children.append(LegacyTextNode(text))
+        return element
+
+
+def legacy_table():
+    table = LegacyElement("table")
+    for i in range(ROWS):
+        row = table.add("tr")
+        row.add("td", str(i))
+        row.add("td", "name")
+        row.add("td", "value", cls="num")
+    return table
+
+
+def compact_table():
+    doc = Html()
+    with doc.table():
+        for i in range(ROWS):
+            with doc.tr():
+                doc.td(str(i))
+                doc.td("name")
+                doc.td("value", cls="num")
+    return doc
+
+
+def main():
+    # Each row is one tr, three td elements and three text children.
+    nodes = ROWS * 7
+    for name, build in (("legacy", legacy_table), ("compact", compact_table)):
+        _table, size = retained(build)
+        print(f"{name:<10} {size / 1024:>10.1f} KiB {size / nodes:>8.1f} bytes/node")
+        del _table
+
+
+main()
@@ -0,0 +1,51 @@
+"""Compare the single-buffer render engine with nested string concatenation."""
+
+from common import measure, report
+from makeweb.html import Element, Html, html_constants
+
+
+def nested_render(element):
+    """The previous render implementation, kept here as the baseline."""
+    if isinstance(element, str):
+        return element
+    if not isinstance(element, Element):
+        return element.render()
+    attrs = element._render_atts()
+    if element.tag in html_constants.void_tags:
+        return f"<{element.tag}{attrs}/>"
+    content = "".join(nested_render(child) for child in element.children)
+    return f"<{element.tag}{attrs}>{content}</{element.tag}>"
+
+
+def deep_document(depth=60):
+    doc = Html()
+    elements = []
+    for level in range(depth):
+        element = doc.div(cls="level", data_depth=level)
+        element.__enter__()
+        elements.append(element)
+        doc.p("x" * 200)
+    for element in reversed(elements):
+        element.__exit__(None, None, None)
+    return doc
+
+
+def wide_document(width=10000):
+    doc = Html()
+    with doc.ul():
+        for i in range(width):
+            doc.li(f"Entry number {i}", cls="entry")
+    return doc
+
+
+def main():
+    for name, doc, repeat in (
+        ("deep (60 levels)", deep_document(), 20),
+        ("wide (10k children)", wide_document(), 3),
+    ):
+        assert doc.render() == doc.DOCTYPE + nested_render(doc.root)
+        report(f"{name} nested", *measure(lambda: nested_render(doc.root), repeat))
+        report(f"{name} single buffer", *measure(doc.render, repeat))
+
+
+main()
@@ -0,0 +1,50 @@
+"""Compare the decimating sparkline engine with one point per sample."""
+
+import math
+
+from common import measure, report
+from makeweb.sparkline import create_sparkline
+
+
+def polyline_sparkline(data, width=100, height=20, line_color="currentColor"):
+    """The previous implementation, kept here as the baseline."""
+    min_y = min(data)
+    max_y = max(data)
+    if min_y == max_y:
+        max_y = min_y + 1
+    points = []
+    data_len = len(data)
+    for i, value in enumerate(data):
+        x = (i / (data_len - 1)) * width if data_len > 1 else width / 2
+        y = height - ((value - min_y) / (max_y - min_y)) * height
+        points.append(f"{x:.1f},{y:.1f}")
+    return (
+        f'<svg width="{width}" height="{height}" class="sparkline" '
+        f'viewBox="0 0 {width} {height}" xmlns="http://www.w3.org/2000/svg">'
+        f'<polyline fill="none" stroke="{line_color}" stroke-width="1.5" '
+        f'points="{" ".join(points)}"/></svg>'
+    )
+
+
+def main():
+    for size in (1000, 100000, 1000000):
+        try:
+            data = [math.sin(i / 50) + (i % 7) / 10 for i in range(size)]
+        except MemoryError:
+            print(f"{size} samples: skipped, not enough memory")
+            continue
+        repeat = 5 if size <= 100000 else 1
+        ms, allocated = measure(lambda: polyline_sparkline(data), repeat)
+        report(
+            f"{size} samples polyline ({len(polyline_sparkline(data))} B)",
+            ms,
+            allocated,
+        )
+        ms, allocated = measure(lambda: create_sparkline(data), repeat)
+        report(
+            f"{size} samples decimated ({len(create_sparkline(data))} B)", ms, allocated
+        )
+        del data
+
+
+main()
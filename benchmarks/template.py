@@ -0,0 +1,113 @@
+"""Compare per-request page building with compiled templates."""
+
+from common import measure, report
+from makeweb.html import Html, HtmlFragment, Template
+
+STYLE = "body { font-family: sans-serif; }\n" * 40
+TODOS = [
+    (f"{i:06d}", {"text": f"Todo {i}", "completed": i % 3 == 0}) for i in range(50)
+]
+CARDS = {
+    "Temperature": {"Outdoor": "21.3°C", "Indoor": "22.0°C"},
+    "Wind": {"Speed": "4.1 km/h", "Gust": "9.0 km/h", "Direction": "180°"},
+    "Pressure": {"Relative": "1013.2 hPa", "Absolute": "1009.8 hPa"},
+    "Humidity": {"Outdoor": "55%", "Indoor": "40%"},
+    "Rain": {"Hourly rate": "0.0 mm", "Daily": "1.2 mm", "Event": "1.2 mm"},
+}
+
+
+def head(doc, title):
+    with doc.head():
+        doc.title(title)
+        doc.meta(charset="utf-8")
+        doc.style(STYLE)
+
+
+def todo_page():
+    doc = Html(lang="en")
+    with doc:
+        head(doc, "Todo List")
+        with doc.body():
+            doc.h1("Todo List")
+            for todo_id, todo in TODOS:
+                with doc.div(cls="todo-item"):
+                    with doc.form(method="POST", action=f"/toggle/{todo_id}"):
+                        doc.span(todo["text"], cls="todo-text")
+    return doc.render()
+
+
+def todo_row(doc, slot):
+    with doc.form(method="POST", action=slot("action")):
+        doc.span(slot("text"), cls="todo-text")
+
+
+def todo_layout(doc, slot):
+    with doc:
+        head(doc, "Todo List")
+        with doc.body():
+            doc.h1("Todo List")
+            doc.add_child(
+                slot("todos", Template(todo_row, HtmlFragment("div", cls="todo-item")))
+            )
+
+
+def weather_page():
+    doc = Html(lang="en")
+    with doc:
+        head(doc, "Weather")
+        with doc.body():
+            with doc.main():
+                for title, items in CARDS.items():
+                    with doc.div(cls="section"):
+                        doc.h2(title)
+                        for label, value in items.items():
+                            with doc.p():
+                                doc.span(label, cls="label")
+                                doc.span(value, cls="value")
+    return doc.render()
+
+
+def weather_layout(doc, slot):
+    with doc:
+        head(doc, "Weather")
+        with doc.body():
+            with doc.main():
+                for title, items in CARDS.items():
+                    with doc.div(cls="section"):
+                        doc.h2(title)
+                        for label in items:
+                            with doc.p():
+                                doc.span(label, cls="label")
+                                doc.span(slot(f"{title}/{label}"), cls="value")
+
+
+def main():
+    todo_template = Template(todo_layout, Html(lang="en"))
+    todo_values = {
+        "todos": [
+            {"action": f"/toggle/{todo_id}", "text": todo["text"]}
+            for todo_id, todo in TODOS
+        ]
+    }
+    weather_template = Template(weather_layout, Html(lang="en"))
+    weather_values = {
+        f"{title}/{label}": value
+        for title, items in CARDS.items()
+        for label, value in items.items()
+    }
+    assert todo_template.render(todo_values) == todo_page()
+    assert weather_template.render(weather_values) == weather_page()
+
+    report("todo page built per request", *measure(todo_page, 50))
+    report(
+        "todo compiled template",
+        *measure(lambda: todo_template.render(todo_values), 50),
+    )
+    report("weather page built per request", *measure(weather_page, 50))
+    report(
+        "weather compiled template",
+        *measure(lambda: weather_template.render(weather_values), 50),
+    )
+
+
+main()
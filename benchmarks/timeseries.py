@@ -0,0 +1,38 @@
+"""Measure time series ingestion and range queries."""
+
+import os
+
+from common import measure, report
+from makeweb import DictDB
+from makeweb.timeseries import TimeSeries
+
+SAMPLES = 10000
+T0 = 1700000000
+
+
+def main():
+    filename = "bench_timeseries.db"
+    db = DictDB(filename)
+    series = TimeSeries(db, "bench")
+
+    def ingest():
+        for i in range(SAMPLES):
+            series.add(float(i % 100), T0 + i)
+        series.flush()
+
+    ms, allocated = measure(ingest)
+    report(f"{SAMPLES} inserts ({SAMPLES * 1000 / ms:.0f}/s)", ms, allocated)
+    report(
+        "query 1 hour, raw",
+        *measure(lambda: series.query(T0, T0 + 3599, width=100), 10),
+    )
+    report(
+        "query all, rollups",
+        *measure(lambda: series.query(T0, T0 + SAMPLES, width=100), 10),
+    )
+    db.close()
+    print(f"file size: {os.stat(filename)[6] / 1024:.1f} KiB")
+    os.remove(filename)
+
+
+main()
@@ -1,4 +1,4 @@
-from makeweb import App
+from makeweb import App, RingBuffer, static
 
 app = App()
 app.host = "0.0.0.0"
@@ -33,44 +33,31 @@ class WeatherFromStation:
         self.yearlyrainin = kwargs.get("yearlyrainin", 0.0)
 
 
-class WeatherHistory:
-    """Store historical weather data with a fixed length."""
-
-    def __init__(self, max_length: int = 60):
-        self.max_length = max_length
-        self.values: list[float] = []
-
-    def add(self, value: float):
-        self.values.append(value)
-        if len(self.values) > self.max_length:
-            self.values.pop(0)
-
-
 class Weather:
     """Converts WeatherFromStation to metric units with humanized output."""
 
     def __init__(self, data: WeatherFromStation):
         self.data = data
         # Initialize history tracking
-        self.temp_history = WeatherHistory()
-        self.temp_indoor_history = WeatherHistory()
-        self.wind_speed_history = WeatherHistory()
-        self.pressure_history = WeatherHistory()
-        self.humidity_history = WeatherHistory()
-        self.rain_rate_history = WeatherHistory()
-        self.solar_radiation_history = WeatherHistory()
+        self.temp_history = RingBuffer(60)
+        self.temp_indoor_history = RingBuffer(60)
+        self.wind_speed_history = RingBuffer(60)
+        self.pressure_history = RingBuffer(60)
+        self.humidity_history = RingBuffer(60)
+        self.rain_rate_history = RingBuffer(60)
+        self.solar_radiation_history = RingBuffer(60)
         # Update histories
         self._update_histories()
 
     def _update_histories(self):
         """Update historical data."""
-        self.temp_history.add(self._to_celsius(self.data.tempf))
-        self.temp_indoor_history.add(self._to_celsius(self.data.tempinf))
-        self.wind_speed_history.add(self._to_kmph(self.data.windspeedmph))
-        self.pressure_history.add(self._to_hpa(self.data.baromrelin))
-        self.humidity_history.add(float(self.data.humidity))
-        self.rain_rate_history.add(self._to_mm(self.data.hourlyrainin))
-        self.solar_radiation_history.add(float(self.data.solarradiation))
+        self.temp_history.append(self._to_celsius(self.data.tempf))
+        self.temp_indoor_history.append(self._to_celsius(self.data.tempinf))
+        self.wind_speed_history.append(self._to_kmph(self.data.windspeedmph))
+        self.pressure_history.append(self._to_hpa(self.data.baromrelin))
+        self.humidity_history.append(float(self.data.humidity))
+        self.rain_rate_history.append(self._to_mm(self.data.hourlyrainin))
+        self.solar_radiation_history.append(float(self.data.solarradiation))
 
     def _to_celsius(self, f: float) -> float:
         """Convert Fahrenheit to Celsius."""
@@ -243,6 +230,171 @@ def recv(request):
     return "OK\n"
 
 
+@static
+def page_head():
+    with app.html_fragment("head") as head:
+        head.meta(charset="utf-8")
+        head.meta(name="viewport", content="width=device-width, initial-scale=1.0")
+        head.title("Weather")
+        head.style(
+            """
+            /* Theme variables */
+            :root {
+                --primary: #007bff;
+                --secondary: #6c757d;
+                --success: #28a745;
+                --info: #17a2b8;
+                --warning: #ffc107;
+                --danger: #dc3545;
+                    
+                /* Light theme (default) */
+                --bg-primary: #f8f9fa;
+                --bg-secondary: #ffffff;
+                --text-primary: #343a40;
+                --text-secondary: #6c757d;
+                --border-color: #ddd;
+                --card-shadow: 0 2px 4px rgba(0,0,0,0.1);
+                --divider-color: #eee;
+                    
+                font-size: 16px;
+            }
+
+            /* Dark theme */
+            @media (prefers-color-scheme: dark) {
+                :root {
+                    --bg-primary: #1a1a1a;
+                    --bg-secondary: #2d2d2d;
+                    --text-primary: #e0e0e0;
+                    --text-secondary: #ababab;
+                    --border-color: #404040;
+                    --card-shadow: 0 2px 4px rgba(0,0,0,0.3);
+                    --divider-color: #404040;
+                }
+            }
+
+            /* Add smooth transitions */
+            * {
+                transition: background-color 0.3s ease, color 0.3s ease;
+            }
+
+            /* Reset and box model */
+            *, *::before, *::after {
+                box-sizing: border-box;
+                margin: 0;
+                padding: 0;
+            }
+
+            /* Layout */
+            body { 
+                background-color: var(--bg-primary);
+                color: var(--text-primary);
+                width: 100%;
+                max-width: 1200px;
+                margin: 0 auto;
+                padding: 1rem;
+            }
+
+            main {
+                display: grid;
+                grid-template-columns: 1fr;
+                gap: 1.5rem;
+                width: 100%;
+            }
+
+            /* Typography */
+            body {
+                font-size: 1rem;
+                font-family: sans-serif;
+            }
+
+            /* Components */
+            header {
+                margin-bottom: 2rem;
+                padding-bottom: 1rem;
+                border-bottom: 1px solid var(--border-color);
+                display: flex;
+                justify-content: space-between;
+                align-items: baseline;
+            }
+
+            header h1 {
+                font-size: 2rem;
+                color: var(--primary);
+            }
+
+            header span {
+                font-size: 0.9rem;
+                color: var(--text-secondary);
+            }
+
+            .section {
+                background: var(--bg-secondary);
+                padding: 1.5rem;
+                border-radius: 8px;
+                box-shadow: var(--card-shadow);
+            }
+
+            .section h2 {
+                color: var(--primary);
+                margin-bottom: 1rem;
+                font-size: 1.4rem;
+            }
+
+            .section p {
+                display: flex;
+                justify-content: space-between;
+                margin-bottom: 0.5rem;
+                padding: 0.5rem 0;
+                border-bottom: 1px solid var(--divider-color);
+            }
+
+            .section p:last-child {
+                border-bottom: none;
+            }
+
+            .label {
+                color: var(--text-secondary);
+            }
+
+            .value {
+                font-weight: 500;
+            }
+
+            footer {
+                margin-top: 2rem;
+                padding-top: 1rem;
+                border-top: 1px solid var(--border-color);
+                text-align: center;
+                color: var(--text-secondary);
+                font-size: 0.9rem;
+            }
+
+            /* Responsive */
+            @media (min-width: 768px) {
+                body {
+                    padding: 2rem;
+                }
+                main {
+                    grid-template-columns: repeat(3, 1fr);
+                }
+            }
+
+            /* Add to existing CSS */
+            .value-container {
+                display: flex;
+                align-items: center;
+                gap: 1rem;
+                justify-content: flex-end;
+            }
+
+            .sparkline {
+                opacity: 0.8;
+            }
+            """
+        )
+    return head
+
+
 @app.page("/")
 def index(doc, _request):
     data = app.data
@@ -250,13 +402,17 @@ def index(doc, _request):
     def render_card(
         title: str, items: dict, sparkline: tuple[list[float], dict] = None
     ):
+        # A chart with several series is shown next to the first of its labels.
+        labels = sparkline[1].get("label") if sparkline else None
+        if isinstance(labels, list):
+            labels = labels[0]
         with doc.div(cls="section"):
             doc.h2(title)
             for label, value in items.items():
                 with doc.p():
                     doc.span(label, cls="label")
                     with doc.span(cls="value-container"):
-                        if sparkline and label == sparkline[1].get("label"):
+                        if sparkline and label == labels:
                             doc.sparkline(
                                 sparkline[0],
                                 **{
@@ -268,166 +424,7 @@ def index(doc, _request):
                         doc.span(value, cls="value")
 
     with doc:
-        with doc.head():
-            doc.meta(charset="utf-8")
-            doc.meta(name="viewport", content="width=device-width, initial-scale=1.0")
-            doc.title("Weather")
-            doc.style(
-                """
-                /* Theme variables */
-                :root {
-                    --primary: #007bff;
-                    --secondary: #6c757d;
-                    --success: #28a745;
-                    --info: #17a2b8;
-                    --warning: #ffc107;
-                    --danger: #dc3545;
-                    
-                    /* Light theme (default) */
-                    --bg-primary: #f8f9fa;
-                    --bg-secondary: #ffffff;
-                    --text-primary: #343a40;
-                    --text-secondary: #6c757d;
-                    --border-color: #ddd;
-                    --card-shadow: 0 2px 4px rgba(0,0,0,0.1);
-                    --divider-color: #eee;
-                    
-                    font-size: 16px;
-                }
-
-                /* Dark theme */
-                @media (prefers-color-scheme: dark) {
-                    :root {
-                        --bg-primary: #1a1a1a;
-                        --bg-secondary: #2d2d2d;
-                        --text-primary: #e0e0e0;
-                        --text-secondary: #ababab;
-                        --border-color: #404040;
-                        --card-shadow: 0 2px 4px rgba(0,0,0,0.3);
-                        --divider-color: #404040;
-                    }
-                }
-
-                /* Add smooth transitions */
-                * {
-                    transition: background-color 0.3s ease, color 0.3s ease;
-                }
-
-                /* Reset and box model */
-                *, *::before, *::after {
-                    box-sizing: border-box;
-                    margin: 0;
-                    padding: 0;
-                }
-
-                /* Layout */
-                body { 
-                    background-color: var(--bg-primary);
-                    color: var(--text-primary);
-                    width: 100%;
-                    max-width: 1200px;
-                    margin: 0 auto;
-                    padding: 1rem;
-                }
-
-                main {
-                    display: grid;
-                    grid-template-columns: 1fr;
-                    gap: 1.5rem;
-                    width: 100%;
-                }
-
-                /* Typography */
-                body {
-                    font-size: 1rem;
-                    font-family: sans-serif;
-                }
-
-                /* Components */
-                header {
-                    margin-bottom: 2rem;
-                    padding-bottom: 1rem;
-                    border-bottom: 1px solid var(--border-color);
-                    display: flex;
-                    justify-content: space-between;
-                    align-items: baseline;
-                }
-
-                header h1 {
-                    font-size: 2rem;
-                    color: var(--primary);
-                }
-
-                header span {
-                    font-size: 0.9rem;
-                    color: var(--text-secondary);
-                }
-
-                .section {
-                    background: var(--bg-secondary);
-                    padding: 1.5rem;
-                    border-radius: 8px;
-                    box-shadow: var(--card-shadow);
-                }
-
-                .section h2 {
-                    color: var(--primary);
-                    margin-bottom: 1rem;
-                    font-size: 1.4rem;
-                }
-
-                .section p {
-                    display: flex;
-                    justify-content: space-between;
-                    margin-bottom: 0.5rem;
-                    padding: 0.5rem 0;
-                    border-bottom: 1px solid var(--divider-color);
-                }
-
-                .section p:last-child {
-                    border-bottom: none;
-                }
-
-                .label {
-                    color: var(--text-secondary);
-                }
-
-                .value {
-                    font-weight: 500;
-                }
-
-                footer {
-                    margin-top: 2rem;
-                    padding-top: 1rem;
-                    border-top: 1px solid var(--border-color);
-                    text-align: center;
-                    color: var(--text-secondary);
-                    font-size: 0.9rem;
-                }
-
-                /* Responsive */
-                @media (min-width: 768px) {
-                    body {
-                        padding: 2rem;
-                    }
-                    main {
-                        grid-template-columns: repeat(3, 1fr);
-                    }
-                }
-
-                /* Add to existing CSS */
-                .value-container {
-                    display: flex;
-                    align-items: center;
-                    gap: 1rem;
-                    justify-content: flex-end;
-                }
-
-                .sparkline {
-                    opacity: 0.8;
-                }
-                """
-            )
+        doc.add_child(page_head())
         with doc.body():
             with doc.header():
                 with doc.div():
@@ -443,7 +440,7 @@ def index(doc, _request):
                     "Temperature",
                     {"Outdoor": data.temp, "Indoor": data.temp_indoor},
                     (
-                        [data.temp_history.values, data.temp_indoor_history.values],
+                        [data.temp_history, data.temp_indoor_history],
                         {
                             "label": ["Outdoor", "Indoor"],
                             "line_color": ["#ff7c7c", "#ffa07c"],
@@ -460,7 +457,7 @@ def index(doc, _request):
                         "Max gust": data.max_daily_gust,
                     },
                     (
-                        data.wind_speed_history.values,
+                        data.wind_speed_history,
                         {"label": "Speed", "line_color": "#7cb5ff"},
                     ),
                 )
@@ -469,7 +466,7 @@ def index(doc, _request):
                     "Pressure",
                     {"Relative": data.pressure, "Absolute": data.pressure_absolute},
                     (
-                        data.pressure_history.values,
+                        data.pressure_history,
                         {"label": "Relative", "line_color": "#7cff7c"},
                     ),
                 )
@@ -487,7 +484,7 @@ def index(doc, _request):
                         "Event": data.rain_event,
                     },
                     (
-                        data.rain_rate_history.values,
+                        data.rain_rate_history,
                         {"label": "Hourly rate", "line_color": "#7ca9ff"},
                     ),
                 )
@@ -496,7 +493,7 @@ def index(doc, _request):
                     "Solar Radiation",
                     {"Radiation": data.solar_radiation, "UV Index": str(data.uv_index)},
                     (
-                        data.solar_radiation_history.values,
+                        data.solar_radiation_history,
                         {"label": "Radiation", "line_color": "#ffeb3b"},
                     ),
                 )
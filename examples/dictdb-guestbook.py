@@ -15,7 +15,7 @@ def render_entry(timestamp, name, message):
     return entry
 
 
-def render_page(entries):
+def render_page(entries, cursor=None):
     doc = app.html(lang="en")
     with doc:
         with doc.head():
@@ -50,18 +50,30 @@ def render_page(entries):
             doc.h2("Entries")
             for entry in entries:
                 doc.add_child(entry)
+            if cursor:
+                doc.a("Older entries", href=f"/?cursor={cursor}")
 
     return app.response(doc)
 
 
 @app.route("/")
 def index(request):
-    entries = []
-    for _key, value in db.items(start_key="0", end_key="999999", incl=True):
-        entry = render_entry(value.get("timestamp", 0), value["name"], value["message"])
-        entries.insert(0, entry)
-
-    return render_page(entries)
+    try:
+        records, cursor = db.page(
+            start_key="entry:",
+            end_key="entry;",
+            incl=False,
+            reverse=True,
+            limit=20,
+            cursor=request.args.get("cursor"),
+        )
+    except ValueError:
+        return "Invalid cursor", 400
+    entries = [
+        render_entry(value.get("timestamp", 0), value["name"], value["message"])
+        for _key, value in records
+    ]
+    return render_page(entries, cursor)
 
 
 @app.route("/add", methods=["POST"])
@@ -70,11 +82,7 @@ def add_entry(request):
     message = request.form.get("message")
 
     if name and message:
-        counter = db.get("counter", 0)
-        counter += 1
-        key = f"{counter:06d}"
-        db["counter"] = counter
-        db[key] = {"name": name, "message": message, "timestamp": time.time()}
+        db.append("entry:", {"name": name, "message": message, "timestamp": time.time()})
 
     return app.redirect("/")
 
@@ -1,14 +1,15 @@
 from microdot import Microdot, Response, send_file
-from makeweb.html import Html, HtmlFragment
+from makeweb.html import Html, HtmlFragment, Markup, static
 
 app = Microdot()
 
 
+@static
 def make_navigation():
     with HtmlFragment("nav", cls="toolbar") as nav:
         nav.style("nav a { margin-right: 0.75rem; }")
         nav.a("Home", href="/")
-        nav.span("&nbsp;")
+        nav.span(Markup("&nbsp;"))
         nav.a("Social", href="/social")
     return nav
 
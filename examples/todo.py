@@ -1,7 +1,9 @@
-from makeweb import App, DictDB
+from makeweb import App, DictDB, static
 
 app = App()
 db = DictDB("todo.db")
+todos = db.collection("todos")
+todos.create_index("completed", "completed")
 
 
 def render_todo(todo_id, todo):
@@ -21,34 +23,40 @@ def render_todo(todo_id, todo):
     return item
 
 
+@static
+def page_head():
+    with app.html_fragment("head") as head:
+        head.title("Todo List")
+        head.meta(charset="utf-8")
+        head.meta(name="viewport", content="width=device-width, initial-scale=1")
+        head.style(
+            """
+            :root { font-size: 16px; }
+            * { box-sizing: border-box; }
+            body { max-width: 40rem; margin: 0 auto; padding: 1rem; font-family: sans-serif; }
+            .todo-form { margin-bottom: 2rem; display: flex; gap: 0.5rem; }
+            .todo-input { padding: 0.5rem; flex: 1; }
+            .add-btn { padding: 0.5rem 1rem; }
+            .todo-item { display: flex; align-items: center; padding: 0.5rem 0; gap: 0.5rem; }
+            .toggle-form { flex: 1; display: flex; align-items: center; gap: 0.5rem; }
+            .completed { text-decoration: line-through; color: #666; }
+            .delete-btn { padding: 0.25rem 0.5rem; background: #ff4444; color: white; border: none; }
+
+            @media (max-width: 480px) {
+                .todo-form { flex-direction: column; }
+                .todo-item { flex-wrap: wrap; }
+                .todo-input, .add-btn, .delete-btn { width: 100%; }
+                .toggle-form { flex: 1 1 auto; min-width: 200px; }
+            }
+        """
+        )
+    return head
+
+
 def render_page(todos):
     doc = app.html(lang="en")
     with doc:
-        with doc.head():
-            doc.title("Todo List")
-            doc.meta(charset="utf-8")
-            doc.meta(name="viewport", content="width=device-width, initial-scale=1")
-            doc.style(
-                """
-                :root { font-size: 16px; }
-                * { box-sizing: border-box; }
-                body { max-width: 40rem; margin: 0 auto; padding: 1rem; font-family: sans-serif; }
-                .todo-form { margin-bottom: 2rem; display: flex; gap: 0.5rem; }
-                .todo-input { padding: 0.5rem; flex: 1; }
-                .add-btn { padding: 0.5rem 1rem; }
-                .todo-item { display: flex; align-items: center; padding: 0.5rem 0; gap: 0.5rem; }
-                .toggle-form { flex: 1; display: flex; align-items: center; gap: 0.5rem; }
-                .completed { text-decoration: line-through; color: #666; }
-                .delete-btn { padding: 0.25rem 0.5rem; background: #ff4444; color: white; border: none; }
-
-                @media (max-width: 480px) {
-                    .todo-form { flex-direction: column; }
-                    .todo-item { flex-wrap: wrap; }
-                    .todo-input, .add-btn, .delete-btn { width: 100%; }
-                    .toggle-form { flex: 1 1 auto; min-width: 200px; }
-                }
-            """
-            )
+        doc.add_child(page_head())
         with doc.body():
             doc.h1("Todo List")
 
@@ -70,38 +78,34 @@ def render_page(todos):
 
 @app.route("/")
 def index(request):
-    todos = sorted(
-        [(k, v) for k, v in db.items() if k != "counter"],
-        key=lambda x: x[0],
-        reverse=True,
-    )
-    return render_page(todos)
+    if request.args.get("show") == "active":
+        records = reversed(list(todos.find("completed", False)))
+    else:
+        records = todos.items(reverse=True)
+    return render_page(records)
 
 
 @app.route("/add", methods=["POST"])
 def add_todo(request):
     todo_text = request.form.get("todo")
     if todo_text:
-        counter = db.get("counter", 0)
-        counter += 1
-        db["counter"] = counter
-        db[f"{counter:06d}"] = {"text": todo_text, "completed": False}
+        todos[todos.incr("id")] = {"text": todo_text, "completed": False}
     return app.redirect("/")
 
 
-@app.route("/toggle/<todo_id>", methods=["POST"])
+@app.route("/toggle/<int:todo_id>", methods=["POST"])
 def toggle_todo(request, todo_id):
-    if todo_id in db:
-        todo = db[todo_id]
+    if todo_id in todos:
+        todo = todos[todo_id]
         todo["completed"] = not todo.get("completed", False)
-        db[todo_id] = todo
+        todos[todo_id] = todo
     return app.redirect("/")
 
 
-@app.route("/delete/<todo_id>", methods=["POST"])
+@app.route("/delete/<int:todo_id>", methods=["POST"])
 def delete_todo(request, todo_id):
-    if todo_id in db:
-        del db[todo_id]
+    if todo_id in todos:
+        del todos[todo_id]
     return app.redirect("/")
 
 
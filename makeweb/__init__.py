@@ -1,5 +1,8 @@
 from makeweb.app import App
+from makeweb.codec import BinaryCodec, JSONCodec, KeyCodec
 from makeweb.dictdb import DictDB
-from makeweb.html import Html, HtmlFragment
+from makeweb.ringbuffer import RingBuffer
+from makeweb.timeseries import TimeSeries
+from makeweb.html import Frozen, Html, HtmlFragment, Markup, Template, escape, static
 
 __all__ = ["DictDB"]
@@ -1,24 +1,53 @@
 from microdot import Microdot, Response, send_file, redirect
-from makeweb.html import Html, HtmlFragment
+from makeweb.html import Html, HtmlFragment, Template
 from makeweb.dictdb import DictDB
 
 
 class HtmlResponse(Response):
-    def __init__(self, content, status_code=200, headers=None, reason=None):
-        headers = headers or {"Content-Type": "text/html"}
+    def __init__(
+        self, content, status_code=200, headers=None, reason=None, stream=False
+    ):
+        headers = dict(headers) if headers else {"Content-Type": "text/html"}
         if isinstance(content, (Html, HtmlFragment)):
-            content = content.render()
+            # Streamed documents are sent in bounded chunks as they render,
+            # instead of building the whole page in memory first.
+            if stream:
+                content = content.iter_render()
+            else:
+                content = content.render_bytes()
+        if isinstance(content, bytearray):
+            # microdot only sizes bytes bodies; a bytearray is sent as is.
+            headers["Content-Length"] = str(len(content))
         super().__init__(
             content, status_code=status_code, headers=headers, reason=reason
         )
 
 
 class App(Microdot):
-    def __init__(self, host="0.0.0.0", port=8000, debug=False, db=None):
+    """A Microdot app that renders makeweb documents.
+
+    With stream=True, the default, pages are sent in CHUNK_SIZE pieces as
+    they render, so peak memory stays bounded however large the page is,
+    but the response has no Content-Length. With stream=False, pages are
+    rendered to one bytes buffer first and sent with a Content-Length,
+    which lets clients reuse the connection and show progress, at the
+    cost of holding the whole page in memory. Compiled templates always
+    take the bytes path, as their output is built in one piece anyway.
+    """
+
+    def __init__(
+        self,
+        host="0.0.0.0",
+        port=8000,
+        debug=False,
+        db=None,
+        stream=True,
+    ):
         super().__init__()
         self.host = host
         self.port = port
         self.debug = debug
+        self.stream = stream
         self._db = None
         self.db = db
 
@@ -36,7 +65,11 @@ class App(Microdot):
     def response(self, content, status_code=200, headers=None, reason=None):
         """Create a new response."""
         return HtmlResponse(
-            content, status_code=status_code, headers=headers, reason=reason
+            content,
+            status_code=status_code,
+            headers=headers,
+            reason=reason,
+            stream=self.stream,
         )
 
     def send_file(self, path, **kwargs):
@@ -47,20 +80,26 @@ class App(Microdot):
         """Redirect to a new location."""
         return redirect(location, status_code=status_code)
 
+    def _builder(self, builder):
+        # Elements are only validated while debugging; tag methods exist
+        # for valid tags alone, so a deployed app skips the checks.
+        builder.strict = self.debug
+        return builder
+
     def html(self, **attrs):
         """Create a new HTML document."""
-        return Html(**attrs)
+        return self._builder(Html(**attrs))
 
     def html_fragment(self, tag, **attrs):
         """Create a new HTML fragment."""
-        return HtmlFragment(tag, **attrs)
+        return self._builder(HtmlFragment(tag, **attrs))
 
     def page(self, url_pattern, methods=None, lang="en"):
         """Create a new HTML page."""
 
         def decorator(func):
             def wrapper(request):
-                doc = Html(lang=lang)
+                doc = self._builder(Html(lang=lang))
                 response = func(doc, request)
                 if isinstance(response, Html):
                     return self.response(response)
@@ -72,12 +111,33 @@ class App(Microdot):
 
         return decorator
 
+    def template(self, url_pattern, layout, methods=None, lang="en"):
+        """Create an HTML page compiled once from layout(doc, slot).
+
+        The decorated function returns a dict of slot values for each
+        request, or any other response (such as a redirect) as is.
+        """
+
+        def decorator(func):
+            compiled = Template(layout, self._builder(Html(lang=lang)))
+
+            def wrapper(request, *args, **kwargs):
+                values = func(request, *args, **kwargs)
+                if isinstance(values, dict):
+                    return self.response(compiled.render_bytes(values))
+                return values
+
+            self.route(url_pattern, methods=methods)(wrapper)
+            return wrapper
+
+        return decorator
+
     def component(self, tag=None, **attrs):
         """Create a new HTML component."""
 
         def decorator(func):
             def wrapper(request, *args, **kwargs):
-                doc = HtmlFragment(root_tag=tag, **attrs)
+                doc = self._builder(HtmlFragment(root_tag=tag, **attrs))
                 response = func(doc, request)
                 if isinstance(response, HtmlFragment):
                     return response
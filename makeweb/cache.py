@@ -0,0 +1,104 @@
+"""
+Cache
+-----
+
+A small least-recently-used cache, bounded by entry count and/or by an
+approximate size in bytes, with counters to help size it.
+
+Example:
+    >>> cache = LRUCache(max_bytes=4096)
+    >>> cache.put("key", "value", size=5)
+    >>> cache.get("key")
+    'value'
+    >>> cache.hits, cache.misses
+    (1, 0)
+"""
+
+
+class LRUCache:
+    """Least-recently-used cache with hit, miss and eviction counters.
+
+    Args:
+        max_entries (int): Maximum number of entries, or None for no limit.
+        max_bytes (int): Maximum total size of the entries, as given to
+            put(), or None for no limit.
+
+    Recency is tracked with a counter per entry instead of an ordered dict
+    (which is a linear scan per lookup on MicroPython). When a limit is
+    exceeded, the least recently used entries are evicted in one batch down
+    to three quarters of the limit, which keeps the eviction scan amortized.
+    """
+
+    def __init__(self, max_entries=None, max_bytes=None):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = {}  # key -> [value, size, last use]
+        self._clock = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    def get(self, key, default=None):
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return default
+        self.hits += 1
+        self._clock += 1
+        entry[2] = self._clock
+        return entry[0]
+
+    def put(self, key, value, size=1):
+        self.discard(key)
+        if self.max_bytes is not None and size > self.max_bytes:
+            return
+        self._clock += 1
+        self._entries[key] = [value, size, self._clock]
+        self.size += size
+        if self._over(self.max_entries, self.max_bytes):
+            self._evict()
+
+    def discard(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self.size -= entry[1]
+
+    def clear(self):
+        self._entries.clear()
+        self.size = 0
+
+    def stats(self):
+        return {
+            "entries": len(self._entries),
+            "bytes": self.size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
+    def _over(self, max_entries, max_bytes):
+        return (max_entries is not None and len(self._entries) > max_entries) or (
+            max_bytes is not None and self.size > max_bytes
+        )
+
+    def _evict(self):
+        max_entries = self.max_entries
+        max_bytes = self.max_bytes
+        if max_entries is not None:
+            max_entries -= max_entries // 4
+        if max_bytes is not None:
+            max_bytes -= max_bytes // 4
+        entries = self._entries
+        for key, entry in sorted(entries.items(), key=lambda item: item[1][2]):
+            if not self._over(max_entries, max_bytes):
+                break
+            del entries[key]
+            self.size -= entry[1]
+            self.evictions += 1
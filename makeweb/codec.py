@@ -0,0 +1,479 @@
+"""
+Codec
+-----
+
+Value codecs for DictDB.
+
+A codec turns a value into bytes with encode() and back with decode().
+JSONCodec stores plain JSON text, as DictDB always has. BinaryCodec, the
+default, uses a compact MessagePack-style format: small integers, floats and
+short strings take one byte plus their payload, and containers carry their
+length up front instead of delimiters.
+
+Binary values start with the TAG byte, which never starts a JSON document,
+so either codec reads records written by the other and databases written
+before binary values existed keep working.
+
+pack_ordered() is a separate, order-preserving encoding used for index keys:
+byte-wise comparison of its output sorts like the values themselves.
+KeyCodec applies the same idea to DictDB keys, leaving str keys as plain
+UTF-8.
+
+Example:
+    >>> codec = BinaryCodec()
+    >>> raw = codec.encode({"text": "milk", "completed": False})
+    >>> codec.decode(raw)
+    {'text': 'milk', 'completed': False}
+"""
+
+import json
+import struct
+
+# 0xc1 is never used by MessagePack and is not valid UTF-8 or JSON.
+TAG = 0xC1
+
+_NONE, _FALSE, _TRUE = 0xC0, 0xC2, 0xC3
+_BIN8, _BIN16, _BIN32 = 0xC4, 0xC5, 0xC6
+_FLOAT32, _FLOAT64 = 0xCA, 0xCB
+_FLOAT32_MAX = 3.4028234663852886e38
+_INT8, _INT16, _INT32, _INT64 = 0xD0, 0xD1, 0xD2, 0xD3
+_STR8, _STR16, _STR32 = 0xD9, 0xDA, 0xDB
+_ARRAY16, _ARRAY32 = 0xDC, 0xDD
+_MAP16, _MAP32 = 0xDE, 0xDF
+
+# Integer sizes, smallest first: (low, high, type byte, format).
+_INTS = (
+    (-0x80, 0x7F, _INT8, ">b"),
+    (-0x8000, 0x7FFF, _INT16, ">h"),
+    (-0x80000000, 0x7FFFFFFF, _INT32, ">i"),
+    (-0x8000000000000000, 0x7FFFFFFFFFFFFFFF, _INT64, ">q"),
+)
+
+# Fixed-size payloads: type byte -> (format, size).
+_FIXED = {
+    _INT8: (">b", 1),
+    _INT16: (">h", 2),
+    _INT32: (">i", 4),
+    _INT64: (">q", 8),
+    _FLOAT32: (">f", 4),
+    _FLOAT64: (">d", 8),
+}
+# Length prefixes: type byte -> (format, size).
+_LENGTHS = {
+    _BIN8: (">B", 1),
+    _BIN16: (">H", 2),
+    _BIN32: (">I", 4),
+    _STR8: (">B", 1),
+    _STR16: (">H", 2),
+    _STR32: (">I", 4),
+    _ARRAY16: (">H", 2),
+    _ARRAY32: (">I", 4),
+    _MAP16: (">H", 2),
+    _MAP32: (">I", 4),
+}
+
+
+def _pack(out, value):
+    if value is None:
+        out.append(_NONE)
+    elif value is True:
+        out.append(_TRUE)
+    elif value is False:
+        out.append(_FALSE)
+    elif isinstance(value, int):
+        if -32 <= value < 128:
+            out.append(value & 0xFF)
+            return
+        for low, high, code, fmt in _INTS:
+            if low <= value <= high:
+                out.append(code)
+                out.extend(struct.pack(fmt, value))
+                return
+        raise ValueError(f"integer {value} does not fit in 64 bits")
+    elif isinstance(value, float):
+        # Packing a larger value as float32 overflows, so only try in range.
+        if -_FLOAT32_MAX <= value <= _FLOAT32_MAX:
+            single = struct.pack(">f", value)
+            if struct.unpack(">f", single)[0] == value:
+                out.append(_FLOAT32)
+                out.extend(single)
+                return
+        out.append(_FLOAT64)
+        out.extend(struct.pack(">d", value))
+    elif isinstance(value, str):
+        data = value.encode()
+        n = len(data)
+        if n < 32:
+            out.append(0xA0 | n)
+        elif n <= 0xFF:
+            out.append(_STR8)
+            out.append(n)
+        elif n <= 0xFFFF:
+            out.append(_STR16)
+            out.extend(struct.pack(">H", n))
+        else:
+            out.append(_STR32)
+            out.extend(struct.pack(">I", n))
+        out.extend(data)
+    elif isinstance(value, dict):
+        n = len(value)
+        if n < 16:
+            out.append(0x80 | n)
+        elif n <= 0xFFFF:
+            out.append(_MAP16)
+            out.extend(struct.pack(">H", n))
+        else:
+            out.append(_MAP32)
+            out.extend(struct.pack(">I", n))
+        for k, v in value.items():
+            _pack(out, k)
+            _pack(out, v)
+    elif isinstance(value, (list, tuple)):
+        n = len(value)
+        if n < 16:
+            out.append(0x90 | n)
+        elif n <= 0xFFFF:
+            out.append(_ARRAY16)
+            out.extend(struct.pack(">H", n))
+        else:
+            out.append(_ARRAY32)
+            out.extend(struct.pack(">I", n))
+        for item in value:
+            _pack(out, item)
+    elif isinstance(value, (bytes, bytearray)):
+        n = len(value)
+        if n <= 0xFF:
+            out.append(_BIN8)
+            out.append(n)
+        elif n <= 0xFFFF:
+            out.append(_BIN16)
+            out.extend(struct.pack(">H", n))
+        else:
+            out.append(_BIN32)
+            out.extend(struct.pack(">I", n))
+        out.extend(value)
+    else:
+        raise TypeError(f"can't encode {type(value).__name__}")
+
+
+def _unpack(data, pos):
+    """Decode the value at data[pos]; return it and the position after it."""
+    code = data[pos]
+    pos += 1
+    if code < 0x80:
+        return code, pos
+    if code >= 0xE0:
+        return code - 0x100, pos
+    if 0xA0 <= code < 0xC0:
+        end = pos + (code & 0x1F)
+        return data[pos:end].decode(), end
+    if code < 0x90:
+        return _unpack_map(data, pos, code & 0x0F)
+    if code < 0xA0:
+        return _unpack_array(data, pos, code & 0x0F)
+    if code == _NONE:
+        return None, pos
+    if code == _FALSE:
+        return False, pos
+    if code == _TRUE:
+        return True, pos
+    fixed = _FIXED.get(code)
+    if fixed is not None:
+        return struct.unpack_from(fixed[0], data, pos)[0], pos + fixed[1]
+    length = _LENGTHS.get(code)
+    if length is None:
+        raise ValueError(f"invalid type byte 0x{code:02x}")
+    n = struct.unpack_from(length[0], data, pos)[0]
+    pos += length[1]
+    if code >= _ARRAY16:
+        if code >= _MAP16:
+            return _unpack_map(data, pos, n)
+        return _unpack_array(data, pos, n)
+    end = pos + n
+    if code >= _STR8:
+        return data[pos:end].decode(), end
+    return bytes(data[pos:end]), end
+
+
+def _unpack_array(data, pos, n):
+    items = []
+    for _ in range(n):
+        item, pos = _unpack(data, pos)
+        items.append(item)
+    return items, pos
+
+
+def _unpack_map(data, pos, n):
+    result = {}
+    for _ in range(n):
+        key, pos = _unpack(data, pos)
+        result[key], pos = _unpack(data, pos)
+    return result, pos
+
+
+def _skip(data, pos):
+    """Return the position after the value at data[pos], without decoding it."""
+    code = data[pos]
+    pos += 1
+    if code < 0x80 or code >= 0xE0 or code in (_NONE, _FALSE, _TRUE):
+        return pos
+    if 0xA0 <= code < 0xC0:
+        return pos + (code & 0x1F)
+    if code < 0xA0:
+        n = code & 0x0F
+        if code < 0x90:
+            n *= 2
+        for _ in range(n):
+            pos = _skip(data, pos)
+        return pos
+    fixed = _FIXED.get(code)
+    if fixed is not None:
+        return pos + fixed[1]
+    length = _LENGTHS.get(code)
+    if length is None:
+        raise ValueError(f"invalid type byte 0x{code:02x}")
+    n = struct.unpack_from(length[0], data, pos)[0]
+    pos += length[1]
+    if code < _ARRAY16:
+        return pos + n
+    if code >= _MAP16:
+        n *= 2
+    for _ in range(n):
+        pos = _skip(data, pos)
+    return pos
+
+
+def _map_length(data, pos):
+    """Return the number of pairs of the map at data[pos] and its first pair."""
+    code = data[pos]
+    if 0x80 <= code < 0x90:
+        return code & 0x0F, pos + 1
+    if code == _MAP16:
+        return struct.unpack_from(">H", data, pos + 1)[0], pos + 3
+    if code == _MAP32:
+        return struct.unpack_from(">I", data, pos + 1)[0], pos + 5
+    return None, pos
+
+
+def _ordered_float(value):
+    """Big-endian double with the sign bit flipped, and all bits if negative."""
+    data = bytearray(struct.pack(">d", value))
+    if data[0] & 0x80:
+        for i in range(8):
+            data[i] ^= 0xFF
+    else:
+        data[0] |= 0x80
+    return data
+
+
+def _unordered_float(data):
+    data = bytearray(data)
+    if data[0] & 0x80:
+        data[0] &= 0x7F
+    else:
+        for i in range(8):
+            data[i] ^= 0xFF
+    return struct.unpack(">d", data)[0]
+
+
+# Beyond this, doubles can't hold every int, so number encodings carry an
+# int's distance from its double in two more bytes.
+_EXACT = float(1 << 53)
+_INT_LIMIT = float(1 << 63)
+
+
+def _pack_number(out, value):
+    """Encode an int or float by value, so ints and floats sort together.
+
+    Numerically equal values, such as 1 and 1.0, get the same encoding.
+    """
+    if isinstance(value, int):
+        if not -0x8000000000000000 <= value <= 0x7FFFFFFFFFFFFFFF:
+            raise ValueError(f"integer {value} does not fit in 64 bits")
+        number = float(value)
+    else:
+        number = value + 0.0  # -0.0 == 0.0, so they share an encoding too
+    out.extend(_ordered_float(number))
+    if not -_EXACT < number < _EXACT:
+        offset = value - int(number) if isinstance(value, int) else 0
+        out.extend(struct.pack(">H", offset + 0x8000))
+
+
+def _unpack_number(data, pos):
+    number = _unordered_float(data[pos : pos + 8])
+    pos += 8
+    if -_EXACT < number < _EXACT:
+        if number == int(number):
+            return int(number), pos
+        return number, pos
+    offset = struct.unpack(">H", data[pos : pos + 2])[0] - 0x8000
+    if offset or -_INT_LIMIT <= number < _INT_LIMIT:
+        return int(number) + offset, pos + 2
+    return number, pos + 2
+
+
+def _pack_ordered(out, value):
+    if value is None:
+        out.append(0x01)
+    elif value is False:
+        out.append(0x02)
+    elif value is True:
+        out.append(0x03)
+    elif isinstance(value, (int, float)):
+        out.append(0x04)
+        _pack_number(out, value)
+    elif isinstance(value, (str, bytes)):
+        out.append(0x06 if isinstance(value, str) else 0x07)
+        data = value.encode() if isinstance(value, str) else value
+        # Escape NUL so the terminator sorts before any continuation.
+        out.extend(data.replace(b"\x00", b"\x00\xff"))
+        out.extend(b"\x00\x01")
+    elif isinstance(value, (list, tuple)):
+        out.append(0x08)
+        for item in value:
+            _pack_ordered(out, item)
+        out.append(0x00)
+    else:
+        raise TypeError(f"can't order {type(value).__name__}")
+
+
+def pack_ordered(value) -> bytes:
+    """Encode value so that the encodings sort in the same order as values.
+
+    Values sort by type first (None, bools, numbers, str, bytes, then tuples
+    or lists), then by value. Ints and floats are both numbers: they sort
+    together, and equal ones such as 1 and 1.0 encode the same. Encodings
+    are self-delimiting, so a key may continue after one.
+    """
+    out = bytearray()
+    _pack_ordered(out, value)
+    return bytes(out)
+
+
+# Key tags: 0x80-0xbf never start UTF-8 text, so they can't be taken for a
+# str key.
+_KEY_NUMBER = 0xA1
+_KEY_STR = 0xA2
+_KEY_TUPLE = 0xA3
+
+
+def _pack_key(out, key):
+    if isinstance(key, (int, float)):
+        out.append(_KEY_NUMBER)
+        _pack_number(out, key)
+    elif isinstance(key, str):
+        out.append(_KEY_STR)
+        out.extend(key.encode().replace(b"\x00", b"\x00\xff"))
+        out.append(0x00)
+    elif isinstance(key, tuple):
+        out.append(_KEY_TUPLE)
+        for item in key:
+            _pack_key(out, item)
+        out.append(0x00)
+    else:
+        raise TypeError(f"can't use {type(key).__name__} as a key")
+
+
+def _unpack_key(data, pos):
+    tag = data[pos]
+    pos += 1
+    if tag == _KEY_NUMBER:
+        return _unpack_number(data, pos)
+    if tag == _KEY_STR:
+        end = data.find(b"\x00", pos)
+        while data[end + 1 : end + 2] == b"\xff":
+            end = data.find(b"\x00", end + 2)
+        return data[pos:end].replace(b"\x00\xff", b"\x00").decode(), end + 1
+    if tag == _KEY_TUPLE:
+        items = []
+        while data[pos] != 0x00:
+            item, pos = _unpack_key(data, pos)
+            items.append(item)
+        return tuple(items), pos + 1
+    raise ValueError(f"invalid key tag 0x{tag:02x}")
+
+
+class KeyCodec:
+    """Encode DictDB keys into bytes that sort like the keys themselves.
+
+    str keys are stored as plain UTF-8, as DictDB always has. Ints (up to 64
+    bits), floats and tuples of these and strs get a tag byte that UTF-8
+    text never starts with. Keys of one type sort in their natural order;
+    across types, ASCII strs come first, then numbers, tuples, and finally
+    other strs. Ints and floats are both numbers and sort together by
+    value; like in a dict, 1 and 1.0 are the same key, and float keys with
+    an integral value read back as ints. Tuples sort element by element, so
+    (1,) is a prefix range for every (1, ...) key.
+    """
+
+    def encode(self, key) -> bytes:
+        if isinstance(key, str):
+            return key.encode()
+        out = bytearray()
+        _pack_key(out, key)
+        return bytes(out)
+
+    def decode(self, raw: bytes):
+        if raw and 0x80 <= raw[0] < 0xC0:
+            return _unpack_key(raw, 0)[0]
+        return raw.decode()
+
+
+class JSONCodec:
+    """Store values as JSON text, readable by any DictDB version."""
+
+    def encode(self, value) -> bytes:
+        return json.dumps(value).encode()
+
+    def decode(self, raw: bytes):
+        if raw and raw[0] == TAG:
+            return _unpack(raw, 1)[0]
+        return json.loads(raw.decode())
+
+
+class BinaryCodec:
+    """Store values in a compact MessagePack-style binary format.
+
+    Supports None, bools, 64-bit ints, floats, str, bytes, lists, tuples
+    (read back as lists) and dicts. Floats that survive a round trip through
+    single precision are stored in four bytes.
+    """
+
+    def encode(self, value) -> bytes:
+        out = bytearray()
+        out.append(TAG)
+        _pack(out, value)
+        return bytes(out)
+
+    def decode(self, raw: bytes):
+        if raw and raw[0] == TAG:
+            return _unpack(raw, 1)[0]
+        return json.loads(raw.decode())
+
+    def decode_fields(self, raw: bytes, fields, default=None) -> list:
+        """Decode only the given fields of a dict value.
+
+        Other values of the dict are skipped over without being decoded.
+        Returns a list with the value of each field, or default where the
+        field is missing or the value isn't a dict.
+        """
+        found = [default] * len(fields)
+        if not raw or raw[0] != TAG:
+            value = json.loads(raw.decode())
+            if isinstance(value, dict):
+                found = [value.get(field, default) for field in fields]
+            return found
+        n, pos = _map_length(raw, 1)
+        if n is None:
+            return found
+        wanted = len(fields)
+        for _ in range(n):
+            key, pos = _unpack(raw, pos)
+            if key in fields:
+                found[fields.index(key)], pos = _unpack(raw, pos)
+                wanted -= 1
+                if not wanted:
+                    break
+            else:
+                pos = _skip(raw, pos)
+        return found
@@ -132,6 +132,11 @@ class html:
         "track",
         "wbr",
     }
+    # Elements whose text content is not parsed as HTML, so never escaped.
+    raw_text_tags = {
+        "script",
+        "style",
+    }
     deprecated_tags = {
         "acronym",
         "applet",
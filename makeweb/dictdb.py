@@ -8,6 +8,11 @@ This module provides a dictionary-like interface to a BTree-based persistence la
 offering both standard dictionary operations and range queries with automatic
 transaction support.
 
+Transactions are committed to an append-only write-ahead log next to the
+database file (``<filename>.wal``): a commit is one sequential write and sync
+of the log, and the btree itself is only flushed on checkpoints. Complete
+transactions left in the log by a crash are replayed when the file is opened.
+
 Example:
     Basic usage:
         >>> db = DictDB('mydata.db')
@@ -20,10 +25,100 @@ Example:
         ...     db['key'] = 'value'
         ...     # Changes are automatically committed on clean exit
         ...     # or rolled back on exception
+
+    Atomic multi-key updates on an open database:
+        >>> with db.transaction():
+        ...     db['counter'] = db.get('counter', 0) + 1
+        ...     db['entry'] = {'text': 'hello'}
+
+    Storing values as JSON text instead of the compact binary default:
+        >>> db = DictDB('mydata.db', codec=JSONCodec())
+
+    Keys can be ints, floats and tuples as well as strings, and sort by value:
+        >>> db[(user_id, timestamp)] = {'event': 'login'}
+        >>> logins = db.items((user_id,), (user_id + 1,), incl=False)
+
+    Caching decoded values of hot keys:
+        >>> db = DictDB('mydata.db', cache_size=64)
+        >>> db['counter']  # Decoded once, then served from memory
+        >>> db.cache_info()['hits']
+
+    Finding records by a field without scanning:
+        >>> db.create_index('completed', 'completed')
+        >>> for key, todo in db.find('completed', False):
+        ...     print(todo['text'])
+
+    Allocating increasing keys:
+        >>> key = db.append('todo:', {'text': 'milk'})  # 'todo:a1', 'todo:a2'...
+
+    Paging through records, newest first:
+        >>> entries, cursor = db.page(reverse=True, limit=20)
+        >>> more, cursor = db.page(reverse=True, limit=20, cursor=cursor)
+
+    Several tables in one file:
+        >>> todos = db.collection('todos')
+        >>> todos[1] = {'text': 'milk'}
+        >>> todos.count()
+
+    Grouping many writes into one flush:
+        >>> with db.batch():
+        ...     for i in range(1000):
+        ...         db[f'item{i}'] = i
 """
 
+import binascii
 import btree  # type: ignore
-import json
+import os
+import struct
+import time
+
+from .cache import LRUCache
+from .codec import BinaryCodec, KeyCodec, pack_ordered
+
+# Keys starting with this byte are reserved for makeweb's own records (such as
+# time series blocks). UTF-8 never produces it, so every str key sorts below.
+RESERVED = b"\xff"
+# Index entries are RESERVED + b"i" + name + NUL + pack_ordered(value) + key,
+# and map to the primary key. RESERVED + b"i" + name marks a built index.
+_INDEX = RESERVED + b"i"
+# Sequences are RESERVED + b"s" + name, holding the highest reserved value.
+_SEQUENCE = RESERVED + b"s"
+# Collection records are RESERVED + b"c" + name + NUL + key.
+_COLLECTION = RESERVED + b"c"
+# Sorts after any raw key, including those in reserved key space.
+_AFTER = RESERVED + RESERVED
+
+# Log records: op (P)ut or (D)elete with key and value lengths, and a (C)ommit
+# marker carrying the CRC32 of the transaction's records.
+_LOG_ENTRY = ">BHI"
+_LOG_ENTRY_SIZE = struct.calcsize(_LOG_ENTRY)
+_LOG_COMMIT = ">BI"
+_LOG_COMMIT_SIZE = struct.calcsize(_LOG_COMMIT)
+_PUT, _DELETE, _COMMIT = b"PDC"
+
+_MISSING = object()
+
+# Millisecond clock for flush_ms. time.time() only has one second resolution
+# on some ports, so use the wrapping tick counter where there is one.
+if hasattr(time, "ticks_ms"):
+    _ticks_ms = time.ticks_ms
+    _ticks_diff = time.ticks_diff
+else:
+
+    def _ticks_ms():
+        return int(time.monotonic() * 1000)
+
+    def _ticks_diff(end, start):
+        return end - start
+
+
+def _copy(value):
+    """Copy the mutable containers of a decoded value."""
+    if isinstance(value, dict):
+        return {k: _copy(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_copy(v) for v in value]
+    return value
 
 
 class DictDB:
@@ -35,19 +130,77 @@ class DictDB:
 
     Args:
         filename (str): Path to the database file. Created if doesn't exist.
+        flush_every (int): Flush to disk after this many writes. The default
+            of 1 writes through on every change; None only flushes on
+            commit(), close() or when flush_ms has passed.
+        flush_ms (int): Also flush on a write when at least this many
+            milliseconds have passed since the last flush. The check only
+            runs on the next write; call flush_due() from an idle loop or
+            timer to bound how long writes stay pending without one.
+        checkpoint_bytes (int): Flush the btree and empty the write-ahead
+            log once the log grows past this size.
+        cache_size (int): Keep up to this many decoded values in memory.
+        cache_bytes (int): Keep decoded values whose encoded size adds up to
+            at most this many bytes in memory.
+        codec: Object with encode(value) -> bytes and decode(raw) methods used
+            for values. Defaults to a BinaryCodec, which also reads values
+            written as JSON.
+        key_codec: Like codec, for keys. Encodings have to sort like the keys
+            and stay below RESERVED. Defaults to a KeyCodec.
 
     Attributes:
         filename (str): The path to the database file being used.
+        SEQUENCE_BLOCK (int): Number of sequence values reserved on disk at
+            a time by incr() and append().
+        cache (LRUCache): The decoded value cache, or None if neither
+            cache_size nor cache_bytes is given.
 
     The database is automatically opened on instantiation. Changes are written
-    to disk immediately by default. When used as a context manager, changes
-    are automatically rolled back if an exception occurs.
+    to disk immediately by default. Inside transaction(), and when used as a
+    context manager, changes are kept in memory until the block exits and
+    are discarded if an exception occurs.
     """
 
-    def __init__(self, filename: str):
+    SEQUENCE_BLOCK = 64
+
+    # Raw key range of the regular keys, and where index entries are stored.
+    _lo = None
+    _hi = RESERVED
+    _index_base = _INDEX
+
+    def __init__(
+        self,
+        filename: str,
+        flush_every=1,
+        flush_ms=None,
+        checkpoint_bytes=65536,
+        cache_size=None,
+        cache_bytes=None,
+        codec=None,
+        key_codec=None,
+    ):
         self.filename = filename
+        self.codec = codec or BinaryCodec()
+        self.key_codec = key_codec or KeyCodec()
+        self.flush_every = flush_every
+        self.flush_ms = flush_ms
+        self.checkpoint_bytes = checkpoint_bytes
         self._db = None
         self._file = None
+        self._log = None
+        self._log_size = 0
+        self._pending = 0  # Writes not flushed to disk yet
+        self._batches = 0  # Depth of nested batch() blocks
+        self._txn = None  # Uncommitted writes, key -> value or None if deleted
+        self._txn_depth = 0
+        self._aborted = False  # A nested transaction failed
+        self._flushed_at = _ticks_ms()
+        self._indexes = {}  # name -> (entry prefix, function of the value)
+        self._sequences = {}  # name -> [last value, highest reserved value]
+        self._collections = {}
+        self.cache = None
+        if cache_size is not None or cache_bytes is not None:
+            self.cache = LRUCache(max_entries=cache_size, max_bytes=cache_bytes)
         self.open()
 
     def open(self) -> None:
@@ -56,65 +209,837 @@ class DictDB:
         except OSError:
             self._file = open(self.filename, "w+b")
         self._db = btree.open(self._file)
+        if self.cache is not None:
+            self.cache.clear()
+        self._recover()
 
     def close(self) -> None:
         if self._db:
-            self._db.flush()
+            self.commit()
             self._db.close()
             self._db = None
         if self._file:
             self._file.close()
             self._file = None
 
+    def commit(self) -> None:
+        """Flush all pending writes to disk and checkpoint the log."""
+        if self._pending:
+            self._db.flush()
+            self._pending = 0
+        if self._log_size:
+            self._truncate_log()
+        self._flushed_at = _ticks_ms()
+
+    def transaction(self):
+        """Context manager for an atomic group of writes.
+
+        Writes inside the block are only visible through this DictDB until it
+        exits, then they are committed to the write-ahead log together. If
+        the block raises, they are discarded. Nested blocks join the
+        outermost transaction: if one raises, the whole transaction is
+        rolled back when the outermost block exits, even if the exception
+        was caught inside it.
+        """
+        return _Transaction(self)
+
+    def _begin(self):
+        if not self._txn_depth:
+            self._txn = {}
+        self._txn_depth += 1
+
+    def _end(self, ok):
+        self._txn_depth -= 1
+        if not ok:
+            self._txn = {}
+            self._aborted = True
+        if not self._txn_depth:
+            changes, self._txn = self._txn, None
+            aborted, self._aborted = self._aborted, False
+            if changes and not aborted:
+                self._commit_txn(changes)
+
+    def _commit_txn(self, changes):
+        records = bytearray()
+        for key, value in changes.items():
+            if value is None:
+                records.extend(struct.pack(_LOG_ENTRY, _DELETE, len(key), 0))
+                records.extend(key)
+            else:
+                records.extend(struct.pack(_LOG_ENTRY, _PUT, len(key), len(value)))
+                records.extend(key)
+                records.extend(value)
+        crc = binascii.crc32(records) & 0xFFFFFFFF
+        records.extend(struct.pack(_LOG_COMMIT, _COMMIT, crc))
+        if self._log is None:
+            self._log = open(self.filename + ".wal", "ab")
+        self._log.write(records)
+        self._log.flush()
+        if hasattr(os, "fsync"):
+            os.fsync(self._log.fileno())
+        elif hasattr(os, "sync"):
+            os.sync()
+        self._log_size += len(records)
+
+        self._apply(changes)
+        self._pending += len(changes)
+        if self._log_size >= self.checkpoint_bytes:
+            self.commit()
+
+    def _apply(self, changes):
+        for key, value in changes.items():
+            if value is None:
+                try:
+                    del self._db[key]
+                except KeyError:
+                    pass
+            else:
+                self._db[key] = value
+
+    def _truncate_log(self):
+        if self._log is not None:
+            self._log.close()
+            self._log = None
+        try:
+            os.remove(self.filename + ".wal")
+        except OSError:
+            pass
+        self._log_size = 0
+
+    def _recover(self):
+        """Apply the complete transactions found in the write-ahead log."""
+        try:
+            with open(self.filename + ".wal", "rb") as f:
+                log = f.read()
+        except OSError:
+            return
+        start = pos = 0
+        changes = {}
+        while pos < len(log):
+            if log[pos] == _COMMIT:
+                if pos + _LOG_COMMIT_SIZE > len(log):
+                    break
+                crc = struct.unpack_from(_LOG_COMMIT, log, pos)[1]
+                if binascii.crc32(log[start:pos]) & 0xFFFFFFFF != crc:
+                    break
+                self._apply(changes)
+                pos = start = pos + _LOG_COMMIT_SIZE
+                changes = {}
+                continue
+            if pos + _LOG_ENTRY_SIZE > len(log):
+                break
+            op, key_len, value_len = struct.unpack_from(_LOG_ENTRY, log, pos)
+            pos += _LOG_ENTRY_SIZE
+            if op not in (_PUT, _DELETE) or pos + key_len + value_len > len(log):
+                break
+            key = log[pos : pos + key_len]
+            pos += key_len
+            changes[key] = log[pos : pos + value_len] if op == _PUT else None
+            pos += value_len
+        # Anything after the last valid commit marker is a torn or corrupt
+        # transaction that never committed, so it is dropped with the log.
+        self._db.flush()
+        self._truncate_log()
+
+    def batch(self):
+        """Context manager that defers flushing until the block ends.
+
+        Writes inside the block are flushed once, on exit. Batches only group
+        flushes; writes made before an exception are still kept. Use
+        transaction() for all-or-nothing updates.
+        """
+        return _Batch(self)
+
+    def _written(self):
+        self._pending += 1
+        if not self._batches:
+            self._apply_flush_policy()
+
+    def _apply_flush_policy(self):
+        if self.flush_every and self._pending >= self.flush_every:
+            self.commit()
+        else:
+            self.flush_due()
+
+    def _group(self):
+        # Groups a record write with its index writes: like batch(), but on
+        # exit the flush policy decides whether to commit.
+        return _Group(self)
+
+    def flush_due(self) -> bool:
+        """Commit pending writes if flush_ms has passed since the last flush.
+
+        Returns:
+            bool: True if pending writes were committed.
+        """
+        if (
+            self._pending
+            and not self._batches
+            and self.flush_ms is not None
+            and _ticks_diff(_ticks_ms(), self._flushed_at) >= self.flush_ms
+        ):
+            self.commit()
+            return True
+        return False
+
+    def _get(self, key: bytes):
+        if self._txn is not None and key in self._txn:
+            return self._txn[key]
+        return self._db.get(key)
+
+    def cache_info(self):
+        """Return the value cache's counters, or None without a cache."""
+        if self.cache is None:
+            return None
+        return self.cache.stats()
+
+    def _load(self, key: bytes):
+        """Return a decoded value, through the cache, or _MISSING."""
+        cache = self.cache
+        if cache is not None:
+            value = cache.get(key, _MISSING)
+            if value is not _MISSING:
+                return _copy(value)
+        raw = self._get(key)
+        if raw is None:
+            return _MISSING
+        value = self.codec.decode(raw)
+        # Uncommitted values stay out of the cache in case of a rollback.
+        if cache is not None and (self._txn is None or key not in self._txn):
+            cache.put(key, value, len(raw))
+            return _copy(value)
+        return value
+
+    def _decode(self, key: bytes, raw: bytes):
+        # Scans use cached values but don't add to the cache, so one pass
+        # over the database doesn't evict the hot keys.
+        cache = self.cache
+        if cache is not None and key in cache:
+            return _copy(cache.get(key))
+        return self.codec.decode(raw)
+
+    def _put(self, key: bytes, value: bytes) -> None:
+        if self.cache is not None:
+            self.cache.discard(key)
+        if self._txn is not None:
+            self._txn[key] = value
+            return
+        self._db[key] = value
+        self._written()
+
+    def _delete(self, key: bytes) -> None:
+        if self.cache is not None:
+            self.cache.discard(key)
+        if self._txn is not None:
+            if self._get(key) is None:
+                raise KeyError(key)
+            self._txn[key] = None
+            return
+        del self._db[key]
+        self._written()
+
+    def _scan(self, start, end, flags, reverse=False):
+        """Iterate raw (key, value) pairs, including uncommitted writes.
+
+        The range is start <= key < end (or <= end with btree.INCL) in either
+        direction.
+        """
+        if reverse:
+            items = self._scan_desc(start, end, flags)
+        else:
+            items = self._db.items(start, end, flags)
+        if not self._txn:
+            return items
+        changes = sorted(
+            (
+                key
+                for key in self._txn
+                if (start is None or key >= start)
+                and (end is None or key < end or (flags & btree.INCL and key == end))
+            ),
+            reverse=reverse,
+        )
+        return self._merge(items, changes, reverse)
+
+    def _scan_keys(self, start, end, flags, reverse=False):
+        """Iterate raw keys like _scan(), only reading values if there are
+        uncommitted writes to merge."""
+        if self._txn:
+            return (key for key, _value in self._scan(start, end, flags, reverse))
+        if reverse:
+            return self._scan_desc(start, end, flags, keys=True)
+        return self._db.keys(start, end, flags)
+
+    def _scan_desc(self, start, end, flags, keys=False):
+        # A descending btree scan starts at the smallest key >= its start key,
+        # so at most a key or two past the end of the range are skipped here.
+        # If there is no such key it yields nothing, and every key is below
+        # the end: start from the last one instead.
+        scan = self._db.keys if keys else self._db.items
+        incl = flags & btree.INCL
+        empty = True
+        for item in scan(end, start, btree.DESC | btree.INCL):
+            empty = False
+            key = item if keys else item[0]
+            if end is not None and (key > end or (key == end and not incl)):
+                continue
+            yield item
+        if empty and end is not None:
+            yield from scan(None, start, btree.DESC | btree.INCL)
+
+    def _merge(self, items, changes, reverse=False):
+        txn = self._txn
+        i = 0
+        for key, value in items:
+            while i < len(changes) and (
+                changes[i] > key if reverse else changes[i] < key
+            ):
+                if txn[changes[i]] is not None:
+                    yield changes[i], txn[changes[i]]
+                i += 1
+            if i < len(changes) and changes[i] == key:
+                value = txn[key]
+                i += 1
+                if value is None:
+                    continue
+            yield key, value
+        for key in changes[i:]:
+            if txn[key] is not None:
+                yield key, txn[key]
+
     def __enter__(self):
+        self._begin()
         return self
 
     def __exit__(self, exc_type, exc_val, exc_tb):
+        self._end(exc_type is None)
         self.close()
 
-    def __getitem__(self, key: str):
-        raw_value = self._db[key.encode()].decode()
-        return json.loads(raw_value)
+    def __getitem__(self, key):
+        value = self._load(self.key_codec.encode(key))
+        if value is _MISSING:
+            raise KeyError(key)
+        return value
 
-    def __setitem__(self, key: str, value: str) -> None:
-        json_value = json.dumps(value)
-        self._db[key.encode()] = json_value.encode()
-        self._db.flush()
+    def __setitem__(self, key, value) -> None:
+        raw_key = self.key_codec.encode(key)
+        if not self._indexes:
+            self._put(raw_key, self.codec.encode(value))
+            return
+        with self._group():
+            old = self._load(raw_key)
+            self._put(raw_key, self.codec.encode(value))
+            self._reindex(raw_key, old, value)
 
-    def __delitem__(self, key: str) -> None:
-        del self._db[key.encode()]
-        self._db.flush()
+    def __delitem__(self, key) -> None:
+        self._remove(self.key_codec.encode(key), key)
+
+    def _remove(self, raw_key, key):
+        if not self._indexes:
+            self._delete(raw_key)
+            return
+        with self._group():
+            old = self._load(raw_key)
+            if old is _MISSING:
+                raise KeyError(key)
+            self._delete(raw_key)
+            self._reindex(raw_key, old, _MISSING)
+
+    def collection(self, name: str):
+        """Return the collection called name, a DictDB of its own in this file.
+
+        A collection has its own keys, indexes and sequences, and shares the
+        file, cache, flush policy and transactions of this database.
+        """
+        view = self._collections.get(name)
+        if view is None:
+            view = self._collections[name] = Collection(self, name)
+        return view
 
-    def __contains__(self, key: str) -> bool:
-        return key.encode() in self._db
+    def count(self, start_key=None, end_key=None, incl=True, limit=None) -> int:
+        """Return the number of keys in a range, walking the keys only.
+
+        With a limit, counting stops there: count(limit=1) is a cheap test
+        for an empty range.
+        """
+        start, end, flags = self._bounds(start_key, end_key, incl)
+        n = 0
+        for _key in self._scan_keys(start, end, flags):
+            if n == limit:
+                break
+            n += 1
+        return n
+
+    def aggregate(
+        self,
+        field=None,
+        start_key=None,
+        end_key=None,
+        incl=True,
+        group_by=None,
+        limit=None,
+    ):
+        """Return count, sum, min and max of a field over a range of records.
+
+        Args:
+            field (str): Field of dict records to sum, or None to only count.
+            start_key, end_key, incl: The range, as for items().
+            group_by (str): Field to group the records by.
+            limit (int): Stop after this many records.
+
+        Returns a dict with "count" (the number of records), and, only when
+        field is given, "sum", "min" and "max" of its numeric values (0 and
+        None when there are none). With group_by, returns such a dict for
+        each value of the group field, None for records without it.
+
+        Values are not decoded in full if the codec has decode_fields() and
+        the value isn't cached: only field and group_by are read from them.
+        """
+        if field is None and group_by is None:
+            return {"count": self.count(start_key, end_key, incl, limit)}
+        fields = [f for f in (field, group_by) if f is not None]
+        if field == group_by:
+            fields = fields[:1]
+        decode_fields = getattr(self.codec, "decode_fields", None)
+        groups = {}
+        n = 0
+        start, end, flags = self._bounds(start_key, end_key, incl)
+        for key, raw in self._scan(start, end, flags):
+            if n == limit:
+                break
+            n += 1
+            if decode_fields is not None and (
+                self.cache is None or key not in self.cache
+            ):
+                found = decode_fields(raw, fields)
+            else:
+                value = self._decode(key, raw)
+                if isinstance(value, dict):
+                    found = [value.get(f) for f in fields]
+                else:
+                    found = [None] * len(fields)
+            group = found[-1] if group_by is not None else None
+            stats = groups.get(group)
+            if stats is None:
+                stats = groups[group] = [0, 0, None, None]
+            stats[0] += 1
+            number = found[0] if field is not None else None
+            if isinstance(number, (int, float)) and not isinstance(number, bool):
+                stats[1] += number
+                if stats[2] is None or number < stats[2]:
+                    stats[2] = number
+                if stats[3] is None or number > stats[3]:
+                    stats[3] = number
+        if field is None:
+            result = {group: {"count": stats[0]} for group, stats in groups.items()}
+        else:
+            result = {
+                group: {"count": c, "sum": total, "min": low, "max": high}
+                for group, (c, total, low, high) in groups.items()
+            }
+        if group_by is not None:
+            return result
+        return result.get(None, {"count": 0, "sum": 0, "min": None, "max": None})
+
+    def clear(self, start_key=None, end_key=None, incl=True) -> None:
+        """Delete the keys in a range, or all regular keys."""
+        keys = [key for key, _value in self._range(start_key, end_key, incl)]
+        with self.batch():
+            for key in keys:
+                self._remove(key, key)
+
+    def incr(self, key: str, n: int = 1) -> int:
+        """Advance the sequence named key by n and return its new value.
+
+        Values come from memory and are reserved on disk SEQUENCE_BLOCK at a
+        time, so only one write in a block is flushed. They always increase,
+        across restarts too, but unused values of a block are skipped after
+        reopening. Sequences live in reserved key space, apart from the
+        regular keys, and are not rolled back with transactions.
+        """
+        if n < 1:
+            raise ValueError("n must be at least 1")
+        name = _SEQUENCE + self.key_codec.encode(key)
+        seq = self._sequences.get(name)
+        if seq is None:
+            raw = self._db.get(name)
+            reserved = int(raw.decode()) if raw else 0
+            seq = self._sequences[name] = [reserved, reserved]
+        value = seq[0] + n
+        if value > seq[1]:
+            seq[1] = value + self.SEQUENCE_BLOCK
+            self._db[name] = str(seq[1]).encode()
+            self._db.flush()
+        seq[0] = value
+        return value
+
+    def append(self, prefix: str, value) -> str:
+        """Store value under a new key after all earlier appends to prefix.
+
+        The key is prefix, a letter giving the number of digits, and the next
+        value of the sequence named prefix: 'a9' sorts before 'b10'. Returns
+        the key.
+        """
+        digits = str(self.incr(prefix))
+        key = prefix + chr(96 + len(digits)) + digits
+        self[key] = value
+        return key
+
+    def create_index(self, name: str, field, rebuild=False) -> None:
+        """Maintain an index of records by a field or computed value.
+
+        Args:
+            name (str): Name of the index, used with find().
+            field: Key to read from dict records, or a function that is
+                called with every record and returns the value to index it
+                by. Records without the field, or for which the function
+                returns None, are not indexed.
+            rebuild (bool): Rebuild the index even if it already exists.
+
+        Indexes are stored in the database, but the field has to be given
+        again after each open: call create_index() before writing. Existing
+        records are indexed the first time, or when rebuild is true.
+        """
+        if callable(field):
+            func = field
+        else:
+            func = lambda value: value.get(field) if isinstance(value, dict) else None
+        base = self._index_base + name.encode()
+        self._indexes[name] = (base + b"\x00", func)
+        if rebuild or self._get(base) is None:
+            self.rebuild_index(name)
+
+    def drop_index(self, name: str) -> None:
+        """Stop maintaining an index and delete its entries."""
+        self._clear_index(name)
+        self._indexes.pop(name, None)
+
+    def rebuild_index(self, name: str) -> None:
+        """Recreate all entries of an index from the records."""
+        prefix, func = self._indexes[name]
+        # Collect the entries first: writing while a scan is open is unsafe.
+        entries = []
+        for key, raw in self._scan(self._lo, self._hi, 0):
+            entry = self._index_entry(prefix, func, key, self._decode(key, raw))
+            if entry is not None:
+                entries.append((entry, key))
+        with self.batch():
+            self._clear_index(name)
+            for entry, key in entries:
+                self._put(entry, key)
+            self._put(self._index_base + name.encode(), b"")
+
+    def index_info(self, name: str):
+        """Return the number of entries in an index and their size in bytes."""
+        entries = size = 0
+        base = self._index_base + name.encode()
+        for key, value in self._scan(base + b"\x00", base + b"\x01", 0):
+            entries += 1
+            size += len(key) + len(value)
+        return {"entries": entries, "bytes": size}
+
+    def find(self, index: str, value):
+        """Yield the (key, value) pairs of records whose index value is value."""
+        start = self._indexes[index][0] + pack_ordered(value)
+        return self._find(start, start + _AFTER, 0)
+
+    def find_range(self, index: str, start=None, end=None, incl=True):
+        """Yield (key, value) pairs of records by index value, in index order.
+
+        Only matching records are read and decoded. The range includes start
+        and, if incl is true, end.
+        """
+        prefix = self._indexes[index][0]
+        lo = prefix + pack_ordered(start) if start is not None else prefix
+        if end is None:
+            hi = prefix[:-1] + b"\x01"
+        elif incl:
+            hi = prefix + pack_ordered(end) + _AFTER
+        else:
+            hi = prefix + pack_ordered(end)
+        return self._find(lo, hi, 0)
+
+    def _find(self, start, end, flags):
+        for _entry, key in self._scan(start, end, flags):
+            value = self._load(key)
+            if value is not _MISSING:
+                yield self.key_codec.decode(key), value
+
+    def _clear_index(self, name):
+        prefix = self._index_base + name.encode()
+        with self.batch():
+            keys = [key for key, _value in self._scan(prefix, prefix + b"\x01", 0)]
+            for key in keys:
+                self._delete(key)
+
+    def _index_entry(self, prefix, func, key, value):
+        if value is _MISSING:
+            return None
+        indexed = func(value)
+        if indexed is None:
+            return None
+        return prefix + pack_ordered(indexed) + key
+
+    def _reindex(self, key, old, new):
+        for prefix, func in self._indexes.values():
+            old_entry = self._index_entry(prefix, func, key, old)
+            new_entry = self._index_entry(prefix, func, key, new)
+            if old_entry == new_entry:
+                continue
+            if old_entry is not None:
+                try:
+                    self._delete(old_entry)
+                except KeyError:
+                    pass
+            if new_entry is not None:
+                self._put(new_entry, key)
+
+    def __contains__(self, key) -> bool:
+        return self._get(self.key_codec.encode(key)) is not None
 
     def __iter__(self):
-        for key in self._db:
-            yield key.decode()
-
-    def items(self, start_key=None, end_key=None, incl=True):
-        start = start_key.encode() if start_key is not None else None
-        end = end_key.encode() if end_key is not None else None
-        flags = btree.INCL if incl else 0
-        for key, value in self._db.items(start, end, flags):
-            yield key.decode(), json.loads(value.decode())
-
-    def keys(self, start_key=None, end_key=None, incl=True):
-        start = start_key.encode() if start_key is not None else None
-        end = end_key.encode() if end_key is not None else None
-        flags = btree.INCL if incl else 0
-        for key in self._db.keys(start, end, flags):
-            yield key.decode()
-
-    def values(self, start_key=None, end_key=None, incl=True):
-        start = start_key.encode() if start_key is not None else None
-        end = end_key.encode() if end_key is not None else None
-        flags = btree.INCL if incl else 0
-        for value in self._db.values(start, end, flags):
-            yield json.loads(value.decode())
-
-    def get(self, key: str, default=None):
+        return self.keys()
+
+    def _bounds(self, start_key, end_key, incl):
+        encode = self.key_codec.encode
+        start = encode(start_key) if start_key is not None else self._lo
+        if end_key is not None:
+            return start, encode(end_key), btree.INCL if incl else 0
+        return start, self._hi, 0
+
+    def _range(
+        self,
+        start_key,
+        end_key,
+        incl,
+        reverse=False,
+        cursor=None,
+        limit=None,
+        keys=False,
+    ):
+        """Iterate the raw (key, value) pairs, or keys, of a public range query."""
+        start, end, flags = self._bounds(start_key, end_key, incl)
+        if cursor is not None:
+            try:
+                last = binascii.unhexlify(cursor)
+            except (TypeError, ValueError):
+                raise ValueError(f"invalid cursor {cursor!r}")
+            # A cursor only ever narrows the range, whatever it holds.
+            if reverse:
+                if last <= end:
+                    end, flags = last, 0
+            else:
+                # The smallest key after the last one returned.
+                last += b"\x00"
+                if start is None or last > start:
+                    start = last
+        if keys:
+            items = self._scan_keys(start, end, flags, reverse)
+        else:
+            items = self._scan(start, end, flags, reverse)
+        count = 0
+        for item in items:
+            if count == limit:
+                return
+            count += 1
+            yield item
+
+    def items(
+        self,
+        start_key=None,
+        end_key=None,
+        incl=True,
+        reverse=False,
+        limit=None,
+        cursor=None,
+    ):
+        """Yield (key, value) pairs with start_key <= key <= end_key.
+
+        Args:
+            start_key: First key of the range, or None from the start.
+            end_key: Last key of the range, or None to the end.
+            incl (bool): Whether end_key itself is included.
+            reverse (bool): Iterate from the end of the range backwards.
+            limit (int): Stop after this many pairs.
+            cursor (str): Resume after the last key of a previous page(), in
+                the same direction.
+        """
+        for key, value in self._range(start_key, end_key, incl, reverse, cursor, limit):
+            yield self.key_codec.decode(key), self._decode(key, value)
+
+    def keys(
+        self,
+        start_key=None,
+        end_key=None,
+        incl=True,
+        reverse=False,
+        limit=None,
+        cursor=None,
+    ):
+        """Yield the keys of a range; arguments are the same as for items()."""
+        for key in self._range(
+            start_key, end_key, incl, reverse, cursor, limit, keys=True
+        ):
+            yield self.key_codec.decode(key)
+
+    def values(
+        self,
+        start_key=None,
+        end_key=None,
+        incl=True,
+        reverse=False,
+        limit=None,
+        cursor=None,
+    ):
+        """Yield the values of a range; arguments are the same as for items()."""
+        for key, value in self._range(start_key, end_key, incl, reverse, cursor, limit):
+            yield self._decode(key, value)
+
+    def page(
+        self,
+        start_key=None,
+        end_key=None,
+        incl=True,
+        reverse=False,
+        limit=20,
+        cursor=None,
+    ):
+        """Return one page of a range as (items, cursor).
+
+        Takes the same arguments as items(). The cursor is an opaque string to
+        pass back for the next page, or None after the last page. Each page
+        reads at most limit + 1 records, however large the range is.
+
+        Raises:
+            ValueError: If limit is below 1, or cursor is malformed, as from
+                a tampered URL.
+        """
+        if limit < 1:
+            raise ValueError("limit must be at least 1")
+        items = list(self._range(start_key, end_key, incl, reverse, cursor, limit + 1))
+        next_cursor = None
+        if len(items) > limit:
+            items.pop()
+            next_cursor = binascii.hexlify(items[-1][0]).decode()
+        return [
+            (self.key_codec.decode(key), self._decode(key, value))
+            for key, value in items
+        ], next_cursor
+
+    def get(self, key, default=None):
         try:
             return self[key]
         except KeyError:
             return default
+
+
+class _Batch:
+    def __init__(self, db):
+        self.db = db
+
+    def __enter__(self):
+        self.db._batches += 1
+        return self.db
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.db._batches -= 1
+        if not self.db._batches:
+            self.db.commit()
+        return False
+
+
+class _Group(_Batch):
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.db._batches -= 1
+        if not self.db._batches and self.db._pending:
+            self.db._apply_flush_policy()
+        return False
+
+
+class _Transaction:
+    def __init__(self, db):
+        self.db = db
+
+    def __enter__(self):
+        self.db._begin()
+        return self.db
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.db._end(exc_type is None)
+        return False
+
+
+class _PrefixedKeys:
+    def __init__(self, codec, prefix):
+        self.codec = codec
+        self.prefix = prefix
+
+    def encode(self, key) -> bytes:
+        return self.prefix + self.codec.encode(key)
+
+    def decode(self, raw: bytes):
+        return self.codec.decode(raw[len(self.prefix) :])
+
+
+class Collection(DictDB):
+    """A named key space inside a DictDB, with the same interface.
+
+    Args:
+        db (DictDB): The database the collection is stored in.
+        name (str): Name of the collection.
+
+    Use DictDB.collection() rather than creating one directly. Keys are
+    stored with a prefix in the database's reserved key space, so range
+    scans, count() and clear() only ever see the collection's own keys, and
+    the database's regular keys never include them. Everything else (file,
+    cache, codecs, flush policy and transactions) is the database's.
+    """
+
+    def __init__(self, db, name: str):
+        self._parent = db
+        self.name = name
+        prefix = _COLLECTION + name.encode() + b"\x00"
+        self.key_codec = _PrefixedKeys(db.key_codec, prefix)
+        self._lo = prefix
+        self._hi = prefix[:-1] + b"\x01"
+        self._index_base = _INDEX + b"\x00" + name.encode() + b"\x00"
+        self._indexes = {}
+
+    def __getattr__(self, name):
+        return getattr(self._parent, name)
+
+    def open(self) -> None:
+        pass
+
+    def close(self) -> None:
+        pass
+
+    def commit(self) -> None:
+        self._parent.commit()
+
+    def flush_due(self) -> bool:
+        return self._parent.flush_due()
+
+    def transaction(self):
+        return self._parent.transaction()
+
+    def batch(self):
+        return self._parent.batch()
+
+    def _group(self):
+        return self._parent._group()
+
+    def collection(self, name: str):
+        return self._parent.collection(self.name + "/" + name)
+
+    def _begin(self):
+        self._parent._begin()
+
+    def _end(self, ok):
+        self._parent._end(ok)
+
+    def _put(self, key: bytes, value: bytes) -> None:
+        self._parent._put(key, value)
+
+    def _delete(self, key: bytes) -> None:
+        self._parent._delete(key)
@@ -1,32 +1,185 @@
+import os
+import time
+from .cache import LRUCache
 from .constants import html as html_constants
-from textwrap import dedent  # type: ignore
 from .sparkline import create_sparkline
 
+# Keyword name -> attribute name, e.g. "data_value" -> "data-value".
+_attr_names = {}
+
+# Rendered attribute strings shared by elements with identical attributes.
+_attr_strings = {}
+ATTR_CACHE_SIZE = 512
+
+# Canonical tag name strings, so every element shares the same objects.
+_tag_names = {tag: tag for tag in html_constants.tags}
+
+# Inlined CSS/JS files, rendered and frozen: (tag, path, minify) ->
+# [frozen element, (mtime, size), time of last stat()].
+inline_cache = LRUCache(max_bytes=128 * 1024)
+
+
+class Markup(str):
+    """A string of trusted HTML that is never escaped again."""
+
+    def __html__(self):
+        return self
+
+
+def escape(text, quote=True):
+    """Escape text for use in HTML, or in an attribute value if quote.
+
+    Clean text (the common case) is returned as is, without a copy, and
+    Markup is always returned untouched.
+    """
+    if isinstance(text, Markup):
+        return text
+    if not isinstance(text, str):
+        text = str(text)
+    if "&" in text:
+        text = text.replace("&", "&amp;")
+    if "<" in text:
+        text = text.replace("<", "&lt;")
+    if ">" in text:
+        text = text.replace(">", "&gt;")
+    if quote and '"' in text:
+        text = text.replace('"', "&quot;")
+    return text
+
+
+def _attr_name(key):
+    name = _attr_names.get(key)
+    if name is None:
+        name = key.rstrip("_").replace("_", "-")
+        if name == "cls":
+            name = "class"
+        _attr_names[key] = name
+    return name
+
+
+def _format_attrs(attrs):
+    # Split attributes into regular and data-* attributes
+    regular_attrs = {k: v for k, v in attrs.items() if not k.startswith("data-")}
+    data_attrs = {k: v for k, v in attrs.items() if k.startswith("data-")}
+
+    # Handle regular attributes
+    sorted_attrs = []
+    for k, v in sorted(regular_attrs.items()):
+        if isinstance(v, bool):
+            if v:  # Only add the attribute name if True
+                sorted_attrs.append(f"{k}")
+        elif isinstance(v, list):
+            sorted_attrs.append(f'{k}="{escape(" ".join(str(x) for x in v))}"')
+        else:
+            sorted_attrs.append(f'{k}="{escape(v)}"')
+
+    # Handle data attributes (always include value)
+    sorted_attrs.extend(
+        f'{k}="{escape(v)}"' for k, v in sorted(data_attrs.items())
+    )
+
+    return " " + " ".join(sorted_attrs) if sorted_attrs else ""
+
+
+def _intern_attrs(attrs):
+    """Return the rendered attrs, shared with any identical attribute set."""
+    try:
+        # The value type is part of the key so True and 1 stay distinct.
+        key = tuple((k, v.__class__, v) for k, v in attrs.items())
+        rendered = _attr_strings.get(key)
+    except TypeError:  # Unhashable value, such as a class list.
+        return _format_attrs(attrs)
+    if rendered is None:
+        if len(_attr_strings) >= ATTR_CACHE_SIZE:
+            _attr_strings.clear()
+        rendered = _attr_strings[key] = _format_attrs(attrs)
+    return rendered
+
+
+class Attrs(dict):
+    """Element attributes that keep their rendered form until modified."""
+
+    __slots__ = ("rendered",)
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.rendered = None
+
+    def __setitem__(self, key, value):
+        self.rendered = None
+        super().__setitem__(key, value)
+
+    def __delitem__(self, key):
+        self.rendered = None
+        super().__delitem__(key)
+
+    def clear(self):
+        self.rendered = None
+        super().clear()
+
+    def pop(self, *args):
+        self.rendered = None
+        return super().pop(*args)
+
+    def popitem(self):
+        self.rendered = None
+        return super().popitem()
+
+    def setdefault(self, key, default=None):
+        self.rendered = None
+        return super().setdefault(key, default)
+
+    def update(self, *args, **kwargs):
+        self.rendered = None
+        super().update(*args, **kwargs)
+
+    def render(self):
+        if self.rendered is None:
+            self.rendered = _intern_attrs(self) if self else ""
+        return self.rendered
+
 
 class Element:
+    __slots__ = ("tag", "parent", "children", "_attrs", "html")
+
     def _normalize_attrs(self, attrs):
-        normalized = {}
+        if not attrs:
+            return None
+        normalized = Attrs()
         for key, value in attrs.items():
-            norm_key = key.rstrip("_").replace("_", "-")
-            if norm_key == "cls":
-                norm_key = "class"
+            norm_key = _attr_name(key)
+            # cls takes precedence over class_
+            if key == "class_" and ("cls" in attrs or "cls_" in attrs):
+                continue
             normalized[norm_key] = value
         return normalized
 
-    def __init__(self, tag, parent=None, **attrs):
-        if tag in html_constants.deprecated_tags:
-            raise ValueError(f"{tag} is deprecated")
-        if tag not in html_constants.tags and tag != "html":
-            raise ValueError(f"{tag} is not a valid HTML tag")
+    def __init__(self, tag, parent=None, _validate=True, **attrs):
+        if _validate:
+            if tag in html_constants.deprecated_tags:
+                raise ValueError(f"{tag} is deprecated")
+            if tag not in html_constants.tags and tag != "html":
+                raise ValueError(f"{tag} is not a valid HTML tag")
 
-        self.tag = tag
+        self.tag = _tag_names.get(tag, tag)
         self.parent = parent
         self.children = []
-        self.attrs = self._normalize_attrs(attrs)
+        self._attrs = self._normalize_attrs(attrs)
         self.html = (
             parent if isinstance(parent, Html) else parent.html if parent else None
         )
 
+    @property
+    def attrs(self):
+        # Attributes are only allocated once an element actually has some.
+        if self._attrs is None:
+            self._attrs = Attrs()
+        return self._attrs
+
+    @attrs.setter
+    def attrs(self, value):
+        self._attrs = value if isinstance(value, Attrs) else Attrs(value)
+
     def __enter__(self):
         if self.tag in html_constants.void_tags:
             raise ValueError(f"{self.tag} is a void tag")
@@ -43,7 +196,10 @@ class Element:
 
     def add_child(self, child):
         if isinstance(child, str):
-            child = TextNode(child)
+            if self.tag not in html_constants.raw_text_tags:
+                child = escape(child, False)
+            self.children.append(child)
+            return child
         if isinstance(child, HtmlFragment):
             # Add all children from fragment
             for fragment_child in child.root.children:
@@ -55,51 +211,196 @@ class Element:
         self.children.append(child)
         return child
 
+    def add_text(self, *content):
+        """Add content as a single text child, escaping all but Markup."""
+        if self.tag in html_constants.raw_text_tags:
+            text = "".join(map(str, content))
+        elif len(content) == 1:
+            text = escape(content[0], False)
+        else:
+            text = "".join(escape(item, False) for item in content)
+        self.children.append(text)
+
     def _render_atts(self):
-        if not self.attrs:
+        attrs = self._attrs
+        if not attrs:
             return ""
+        return attrs.render()
 
-        # Split attributes into regular and data-* attributes
-        regular_attrs = {
-            k: v for k, v in self.attrs.items() if not k.startswith("data-")
-        }
-        data_attrs = {k: v for k, v in self.attrs.items() if k.startswith("data-")}
-
-        # Handle regular attributes
-        sorted_attrs = []
-        for k, v in sorted(regular_attrs.items()):
-            if isinstance(v, bool):
-                if v:  # Only add the attribute name if True
-                    sorted_attrs.append(f"{k}")
-            elif isinstance(v, list):
-                sorted_attrs.append(f'{k}="{" ".join(str(x) for x in v)}"')
+    def render(self):
+        out = []
+        self.render_into(out)
+        return "".join(out)
+
+    def render_into(self, out):
+        """Append the rendered element to the list of parts out."""
+        out.extend(self.iter_parts())
+
+    def render_bytes(self):
+        """Render straight to UTF-8, without building the whole page as str."""
+        return _encode_parts(self.iter_parts(encoded=True))
+
+    def freeze(self):
+        """Render this subtree once and return it as a shareable Frozen node."""
+        return Frozen(self.render())
+
+    def iter_parts(self, encoded=False):
+        """Yield the rendered element piece by piece, depth first.
+
+        The tree is walked with an explicit stack instead of recursion, so
+        each part is produced exactly once no matter how deep the nesting.
+        With encoded=True, frozen subtrees are yielded as their pre-encoded
+        bytes instead of text.
+        """
+        void_tags = html_constants.void_tags
+        attrs = self._render_atts()
+        if self.tag in void_tags:
+            yield f"<{self.tag}{attrs}/>"
+            return
+
+        yield f"<{self.tag}{attrs}>"
+        stack = [(iter(self.children), f"</{self.tag}>")]
+        while stack:
+            children, closing_tag = stack[-1]
+            for child in children:
+                if isinstance(child, str):
+                    yield child
+                    continue
+                if not isinstance(child, Element):
+                    if encoded and isinstance(child, Frozen):
+                        yield child.encoded
+                    else:
+                        yield child.render()
+                    continue
+                attrs = child._render_atts()
+                if child.tag in void_tags:
+                    yield f"<{child.tag}{attrs}/>"
+                    continue
+                grandchildren = child.children
+                if len(grandchildren) == 1 and isinstance(grandchildren[0], str):
+                    # Leaf elements holding one text child, the common case,
+                    # are emitted as a single part without visiting them.
+                    yield f"<{child.tag}{attrs}>{grandchildren[0]}</{child.tag}>"
+                    continue
+                yield f"<{child.tag}{attrs}>"
+                stack.append((iter(grandchildren), f"</{child.tag}>"))
+                break
             else:
-                sorted_attrs.append(f'{k}="{v}"')
+                stack.pop()
+                yield closing_tag
+
+
+def _encode_parts(parts):
+    # Each part is encoded into one growing buffer, so the page only ever
+    # exists once, as bytes.
+    out = bytearray()
+    for part in parts:
+        out.extend(part if isinstance(part, bytes) else part.encode())
+    return out
+
+
+def _minify(text, element):
+    """Drop indentation, blank lines and, in stylesheets, comments."""
+    if element == "style":
+        start = text.find("/*")
+        while start != -1:
+            end = text.find("*/", start + 2)
+            if end == -1:
+                break
+            text = text[:start] + text[end + 2 :]
+            start = text.find("/*", start)
+    return "\n".join(line.strip() for line in text.splitlines() if line.strip())
+
+
+def _load_inline(element, path, minify, check_interval):
+    key = (element, path, minify)
+    entry = inline_cache.get(key)
+    now = time.time()
+    if entry is not None and now - entry[2] < check_interval:
+        return entry[0]
+
+    try:
+        stat = os.stat(path)
+        stamp = (stat[8], stat[6])  # mtime, size
+        if entry is not None and entry[1] == stamp:
+            entry[2] = now
+            return entry[0]
+        with open(path, "r") as f:
+            content = f.read()
+    except OSError:
+        inline_cache.discard(key)
+        return None
+
+    if minify:
+        content = _minify(content, element)
+    inline_element = Element(element)
+    inline_element.add_child(content)
+    frozen = inline_element.freeze()
+    inline_cache.put(key, [frozen, stamp, now], len(frozen.encoded))
+    return frozen
 
-        # Handle data attributes (always include value)
-        sorted_attrs.extend(f'{k}="{v}"' for k, v in sorted(data_attrs.items()))
 
-        return " " + " ".join(sorted_attrs) if sorted_attrs else ""
+class TextNode:
+    __slots__ = ("text",)
+
+    def __init__(self, text):
+        self.text = text
 
     def render(self):
-        attrs = self._render_atts()
+        return escape(self.text, False)
 
-        if self.tag in html_constants.void_tags:
-            return f"<{self.tag}{attrs}/>"
+    def render_into(self, out):
+        out.append(self.render())
 
-        content = "".join(child.render() for child in self.children)
-        return f"<{self.tag}{attrs}>{content}</{self.tag}>"
 
+class Frozen:
+    """A subtree rendered once, embedded by reference into any document.
+
+    Frozen nodes have no parent, so the same one can be shared by many
+    documents at once.
+    """
+
+    __slots__ = ("text", "encoded")
 
-class TextNode:
     def __init__(self, text):
         self.text = text
+        self.encoded = text.encode()
 
     def render(self):
-        return str(self.text)
+        return self.text
+
+    def render_into(self, out):
+        out.append(self.text)
+
+    def __str__(self):
+        return self.text
+
+
+def static(func):
+    """Decorator: build a fragment on the first call and reuse it, frozen.
+
+    Arguments only matter for the first call; later calls return the same
+    Frozen node without running the function again.
+    """
+    frozen = None
+
+    def wrapper(*args, **kwargs):
+        nonlocal frozen
+        if frozen is None:
+            frozen = func(*args, **kwargs).freeze()
+        return frozen
+
+    return wrapper
 
 
 class HtmlBuilder:
+    CHUNK_SIZE = 1024
+    # Seconds between stat() checks of an inlined file for changes.
+    INLINE_CHECK_INTERVAL = 2
+    # Validate every element as it is created; App turns this off unless
+    # debug is set, as the tag methods are known to be valid already.
+    strict = True
+
     def __init__(self, root_tag, **attrs):
         self.root = Element(root_tag, **attrs)
         self.current = self.root
@@ -115,28 +416,29 @@ class HtmlBuilder:
         return self
 
     def __getattr__(self, tag):
+        # Only reached for names without a precompiled tag method, which
+        # makes Element raise the appropriate error for invalid tags.
         def tag_method(*content, **attrs):
             element = Element(tag, parent=self.current, **attrs)
             element.html = self
             self.current.add_child(element)
 
             if content:
-                element.add_child("".join(map(str, content)))
+                element.add_text(*content)
 
             return element
 
         return tag_method
 
-    def inline(self, element, inline_path):
+    def inline(self, element, inline_path, minify=False):
         """Read CSS file and add it as an inline style element"""
-        try:
-            with open(inline_path, "r") as f:
-                inline_content = f.read()
-            inline_element = Element(element, parent=self.current)
-            inline_element.add_child(inline_content)
-            self.current.add_child(inline_element)
-        except FileNotFoundError:
+        inline_element = _load_inline(
+            element, inline_path, minify, self.INLINE_CHECK_INTERVAL
+        )
+        if inline_element is None:
             print(f"Warning: Inline file not found: {inline_path}")
+        else:
+            self.current.add_child(inline_element)
         return self
 
     def markdown(self, text):
@@ -147,10 +449,18 @@ class HtmlBuilder:
         self.add_child(md)
         return self
 
+    def markdown_file(self, path, cache_path=None):
+        """Render a markdown file and add it to the current element"""
+        from .markdown import Markdown
+
+        md = Markdown.parse_file(path, cache_path)
+        self.add_child(md)
+        return self
+
     def sparkline(self, data: list[float], **kwargs):
         """Add a sparkline chart"""
         svg = create_sparkline(data, **kwargs)
-        self.current.add_child(svg)
+        self.current.add_child(Markup(svg))
         return self
 
     def __enter__(self):
@@ -161,20 +471,78 @@ class HtmlBuilder:
         return False
 
     def render(self):
-        return self.root.render()
+        out = []
+        self.render_into(out)
+        return "".join(out)
+
+    def render_into(self, out):
+        """Append the rendered document to the list of parts out."""
+        out.extend(self.iter_parts())
+
+    def freeze(self):
+        """Render once and return a Frozen node to embed into other documents."""
+        return Frozen(self.render())
+
+    def iter_parts(self, encoded=False):
+        return self.root.iter_parts(encoded)
+
+    def render_bytes(self):
+        """Render straight to UTF-8, without building the whole page as str."""
+        return _encode_parts(self.iter_parts(encoded=True))
+
+    def iter_render(self, chunk_size=None):
+        """Render as a stream of UTF-8 chunks of at most chunk_size bytes."""
+        chunk_size = chunk_size or self.CHUNK_SIZE
+        buffer = bytearray()
+        for part in self.iter_parts(encoded=True):
+            buffer.extend(part if isinstance(part, bytes) else part.encode())
+            if len(buffer) < chunk_size:
+                continue
+            # Slice chunks through a view and drop them from the buffer once
+            # per part, so a large part isn't copied again for every chunk.
+            view = memoryview(buffer)
+            start = 0
+            while len(buffer) - start >= chunk_size:
+                yield bytes(view[start : start + chunk_size])
+                start += chunk_size
+            buffer = buffer[start:]
+        if buffer:
+            yield bytes(buffer)
 
     def __str__(self):
         return self.render()
 
 
+def _make_tag_method(tag):
+    def tag_method(self, *content, **attrs):
+        current = self.current
+        element = Element(tag, current, self.strict, **attrs)
+        element.html = self
+        current.add_child(element)
+
+        if content:
+            element.add_text(*content)
+
+        return element
+
+    return tag_method
+
+
+# One shared method per tag, instead of a new closure on every call.
+for _tag in html_constants.tags:
+    if not hasattr(HtmlBuilder, _tag):
+        setattr(HtmlBuilder, _tag, _make_tag_method(_tag))
+
+
 class Html(HtmlBuilder):
     DOCTYPE = "<!DOCTYPE html>"
 
     def __init__(self, **attrs):
         super().__init__("html", **attrs)
 
-    def render(self):
-        return self.DOCTYPE + super().render()
+    def iter_parts(self, encoded=False):
+        yield self.DOCTYPE
+        yield from super().iter_parts(encoded)
 
 
 class HtmlFragment(HtmlBuilder):
@@ -187,15 +555,77 @@ class HtmlFragment(HtmlBuilder):
         else:
             super().__init__(root_tag, **attrs)
 
-    def render(self):
-        return super().render()
-
     def markdown(self, text):
-        # Add dedent before processing markdown
-        cleaned_text = dedent(text)
-        # Continue with existing markdown processing
+        # Dedent before processing markdown; cached renders skip both steps.
         from .markdown import Markdown
 
-        md = Markdown.parse(cleaned_text)
+        md = Markdown.parse(text, dedent=True)
         self.add_child(md)
         return self
+
+
+def _slot_parts(value):
+    if isinstance(value, str):
+        # Slots may sit in attribute values, so quotes are escaped too.
+        yield escape(value)
+    elif isinstance(value, (list, tuple)):
+        for item in value:
+            yield from _slot_parts(item)
+    elif hasattr(value, "iter_parts"):
+        yield from value.iter_parts()
+    elif hasattr(value, "render"):
+        yield value.render()
+    elif value is not None:
+        yield escape(value)
+
+
+class Template:
+    """A document compiled once into static segments and fillable slots.
+
+    The layout function is called once as layout(doc, slot). slot(name)
+    returns a placeholder that can be used as text content or as an
+    attribute value; slot(name, template) marks a repeated block that is
+    filled from a list of value dicts, one rendering of template per item.
+    Rendering only joins the pre-rendered segments with the slot values.
+    """
+
+    MARKER = "\x00"
+
+    def __init__(self, layout, doc=None):
+        doc = Html() if doc is None else doc
+        self.templates = {}
+        layout(doc, self.slot)
+        parts = doc.render().split(self.MARKER)
+        self.segments = parts[0::2]
+        self.names = parts[1::2]
+
+    def slot(self, name, template=None):
+        if template is not None:
+            self.templates[name] = template
+        return f"{self.MARKER}{name}{self.MARKER}"
+
+    def iter_parts(self, values):
+        segments = self.segments
+        templates = self.templates
+        yield segments[0]
+        for i, name in enumerate(self.names):
+            value = values.get(name)
+            template = templates.get(name)
+            if template is None:
+                yield from _slot_parts(value)
+            elif value:
+                for item in value:
+                    yield from template.iter_parts(item)
+            yield segments[i + 1]
+
+    def render(self, values=None, **kwargs):
+        """Render with the slot values given as a dict and/or keywords."""
+        if kwargs:
+            values = dict(values or {}, **kwargs)
+        return "".join(self.iter_parts(values or {}))
+
+    def render_bytes(self, values=None, **kwargs):
+        """Like render(), but straight to UTF-8 bytes."""
+        if kwargs:
+            values = dict(values or {}, **kwargs)
+        return _encode_parts(self.iter_parts(values or {}))
@@ -1,17 +1,118 @@
+import hashlib
+import os
 from io import StringIO
-from .html import Element, HtmlFragment
+from textwrap import dedent as dedent_text  # type: ignore
+from .cache import LRUCache
+from .html import Element, Frozen, HtmlFragment
 from udownmark import Markdown as Udownmark
 
+# Rendered markdown, keyed by a hash of the source. Adjust the budget with
+# cache.max_bytes; cache.hits, cache.misses and cache.evictions show how well
+# it is doing.
+cache = LRUCache(max_bytes=64 * 1024)
+
+
+def cache_info():
+    return cache.stats()
+
+
+def _lines(f):
+    # Feed the renderer one line at a time, without the newline, as
+    # str.splitlines() would.
+    for line in f:
+        yield line.rstrip("\n")
+
+
+def _file_stamp(path):
+    stat = os.stat(path)
+    return f"<!-- makeweb {stat[8]} {stat[6]} -->\n"  # mtime, size
+
+
+def _read_sidecar(cache_path, stamp):
+    try:
+        with open(cache_path, "r") as f:
+            if f.readline() != stamp:
+                return None
+            return f.read()
+    except OSError:
+        return None
+
+
+def _render_file(path, out):
+    with open(path, "r") as source:
+        out.write('<div class="markdown">')
+        Udownmark(out).render(_lines(source))
+        out.write("</div>")
+
+
+def _write_sidecar(path, cache_path, stamp):
+    # Render into a temporary file and rename it into place, so a crash
+    # never leaves a truncated sidecar behind.
+    tmp_path = cache_path + ".tmp"
+    try:
+        with open(tmp_path, "w") as out:
+            out.write(stamp)
+            _render_file(path, out)
+        os.rename(tmp_path, cache_path)
+    except OSError:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
 class Markdown:
     @staticmethod
-    def parse(text):
-        output = StringIO()
-        md = Udownmark(output)
-        md.render(text.splitlines())
-        html = output.getvalue()
-        
-        # Create a fragment to hold the markdown content
+    def parse(text, dedent=False):
+        """Render markdown into a new fragment, reusing cached output.
+
+        The rendered HTML is cached, frozen, by a hash of the source; each
+        call wraps it in a fresh fragment, so callers may modify the result.
+        """
+        digest = hashlib.sha256(text.encode())
+        key = (dedent, digest.digest())
+        body = cache.get(key)
+        if body is None:
+            if dedent:
+                text = dedent_text(text)
+            output = StringIO()
+            Udownmark(output).render(text.splitlines())
+            body = Frozen(output.getvalue())
+            cache.put(key, body, len(body.encoded))
         fragment = HtmlFragment("div", cls="markdown")
-        # Add the raw HTML content
-        fragment.add_child(html)
-        return fragment
\ No newline at end of file
+        fragment.add_child(body)
+        return fragment
+
+    @staticmethod
+    def parse_file(path, cache_path=None):
+        """Render a markdown file, caching the HTML in a sidecar file.
+
+        The source is streamed through the renderer line by line into
+        cache_path (path + ".html" by default), stamped with the source's
+        mtime and size. Later calls, including after a restart, only stat()
+        the source and reuse the sidecar until the source changes. If the
+        sidecar cannot be written, the HTML is only cached in memory.
+        """
+        stamp = _file_stamp(path)
+        key = ("file", path)
+        cached = cache.get(key)
+        if cached is not None and cached[0] == stamp:
+            return cached[1]
+
+        cache_path = cache_path or path + ".html"
+        html = _read_sidecar(cache_path, stamp)
+        if html is None:
+            try:
+                _write_sidecar(path, cache_path, stamp)
+                html = _read_sidecar(cache_path, stamp)
+            except OSError:
+                # Read-only or full filesystem: keep the result in memory.
+                pass
+        if html is None:
+            output = StringIO()
+            _render_file(path, output)
+            html = output.getvalue()
+        frozen = Frozen(html)
+        cache.put(key, (stamp, frozen), len(frozen.encoded))
+        return frozen
@@ -0,0 +1,122 @@
+"""
+RingBuffer
+----------
+
+Fixed-capacity numeric history backed by an array, for metrics that are
+sampled continuously and charted with sparklines.
+
+Example:
+    >>> history = RingBuffer(60)
+    >>> history.append(21.5)
+    >>> history.min, history.max, history.mean
+    (21.5, 21.5, 21.5)
+    >>> doc.sparkline(history)
+"""
+
+from array import array
+
+
+class RingBuffer:
+    """A fixed-capacity series of numbers with O(1) append.
+
+    Args:
+        capacity (int): Number of values kept; the oldest value is dropped
+            once the buffer is full.
+        typecode (str): Array typecode, "f" (float32, the default) or "d".
+
+    Values are stored unboxed in a preallocated array. Iteration and
+    indexing are oldest first without copying the buffer, and min, max and
+    mean are kept up to date as values are appended.
+    """
+
+    def __init__(self, capacity: int, typecode: str = "f"):
+        if capacity < 1:
+            raise ValueError("capacity must be at least 1")
+        self.capacity = capacity
+        self._data = array(typecode, [0] * capacity)
+        self._start = 0
+        self._len = 0
+        self._sum = 0.0
+        self._min = None
+        self._max = None
+        self._stale = False  # min/max need a rescan after an eviction
+
+    def __len__(self):
+        return self._len
+
+    def __iter__(self):
+        data = self._data
+        capacity = self.capacity
+        start = self._start
+        for i in range(self._len):
+            yield data[(start + i) % capacity]
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            start, stop, step = index.indices(self._len)
+            return [self[i] for i in range(start, stop, step)]
+        if index < 0:
+            index += self._len
+        if not 0 <= index < self._len:
+            raise IndexError("RingBuffer index out of range")
+        return self._data[(self._start + index) % self.capacity]
+
+    def append(self, value: float):
+        data = self._data
+        capacity = self.capacity
+        if self._len < capacity:
+            index = (self._start + self._len) % capacity
+            self._len += 1
+            evicted = None
+        else:
+            index = self._start
+            evicted = data[index]
+            self._start = (index + 1) % capacity
+        data[index] = value
+        value = data[index]  # As stored, so the stats match the array.
+
+        if evicted is None:
+            self._sum += value
+        else:
+            if self._start == 0:
+                # Recompute once per full cycle so rounding can't build up.
+                self._sum = sum(data)
+            else:
+                self._sum += value - evicted
+            if evicted == self._min or evicted == self._max:
+                self._stale = True
+
+        if not self._stale:
+            if self._min is None or value < self._min:
+                self._min = value
+            if self._max is None or value > self._max:
+                self._max = value
+
+    def clear(self):
+        self._start = 0
+        self._len = 0
+        self._sum = 0.0
+        self._min = None
+        self._max = None
+        self._stale = False
+
+    def _rescan(self):
+        self._min = min(self)
+        self._max = max(self)
+        self._stale = False
+
+    @property
+    def min(self):
+        if self._stale:
+            self._rescan()
+        return self._min
+
+    @property
+    def max(self):
+        if self._stale:
+            self._rescan()
+        return self._max
+
+    @property
+    def mean(self):
+        return self._sum / self._len if self._len else None
@@ -1,3 +1,77 @@
+from .ringbuffer import RingBuffer
+
+
+def _bounds(values):
+    if isinstance(values, RingBuffer):
+        # Kept up to date as values are appended, so no scan is needed.
+        return values.min, values.max
+    return min(values), max(values)
+
+
+def _is_series(data):
+    """True for a single series of numbers, False for a list of series."""
+    return not data or isinstance(data[0], (int, float))
+
+
+def _decimate(values, buckets):
+    """Yield (index, value) pairs, at most two per bucket.
+
+    Each bucket keeps its minimum and maximum in their original order, which
+    preserves peaks and troughs that plain sampling would drop.
+    """
+    count = len(values)
+    if count <= 2 * buckets:
+        for i in range(count):
+            yield i, values[i]
+        return
+
+    step = count / buckets
+    start = 0
+    for bucket in range(1, buckets + 1):
+        end = count if bucket == buckets else int(bucket * step)
+        # Scan the bucket by index, so no slice of the data is copied.
+        low = high = values[start]
+        low_i = high_i = start
+        for i in range(start + 1, end):
+            value = values[i]
+            if value < low:
+                low, low_i = value, i
+            elif value > high:
+                high, high_i = value, i
+        if low_i < high_i:
+            yield low_i, low
+            yield high_i, high
+        elif high_i < low_i:
+            yield high_i, high
+            yield low_i, low
+        else:
+            yield low_i, low
+        start = end
+
+
+def _path(values, width, height, min_y, max_y, scale):
+    """Build compact relative SVG path data in a viewBox scaled by scale."""
+    count = len(values)
+    x_scale = width * scale / (count - 1) if count > 1 else 0
+    y_scale = height * scale / (max_y - min_y)
+    y_base = height * scale
+    parts = []
+    last_x = last_y = None
+    for i, value in _decimate(values, width):
+        x = int(i * x_scale) if count > 1 else width * scale // 2
+        y = int(y_base - (value - min_y) * y_scale)
+        if last_x is None:
+            parts.append(f"M{x} {y}l")
+        else:
+            parts.append(f"{x - last_x} {y - last_y}")
+        last_x = x
+        last_y = y
+    if len(parts) == 1:
+        # A single point still needs a segment to be drawn.
+        parts.append("0 0")
+    return parts[0] + " ".join(parts[1:])
+
+
 def create_sparkline(
     data: list[float],
     width: int = 100,
@@ -7,29 +81,42 @@ def create_sparkline(
     min_value: float = None,
     max_value: float = None,
 ) -> str:
-    """Generate an SVG sparkline chart."""
-    if not data:
+    """Generate an SVG sparkline chart.
+
+    data is one series of numbers (a list, array or RingBuffer) or a list
+    of series, drawn in the same chart; line_color may be a list with one
+    color per series. Long series are decimated to at most two points per
+    horizontal pixel.
+    """
+    series = [data] if _is_series(data) else data
+    series = [values for values in series if len(values)]
+    if not series:
         return ""
+    colors = [line_color] if isinstance(line_color, str) else line_color
 
     # Use provided min/max or calculate from data
-    min_y = min_value if min_value is not None else min(data)
-    max_y = max_value if max_value is not None else max(data)
+    if min_value is None or max_value is None:
+        bounds = [_bounds(values) for values in series]
+    min_y = min_value if min_value is not None else min(b[0] for b in bounds)
+    max_y = max_value if max_value is not None else max(b[1] for b in bounds)
 
     # Prevent division by zero
     if min_y == max_y:
         max_y = min_y + 1
 
-    # Calculate points
-    points = []
-    data_len = len(data)
-    for i, value in enumerate(data):
-        x = (i / (data_len - 1)) * width if data_len > 1 else width / 2
-        y = height - ((value - min_y) / (max_y - min_y)) * height
-        points.append(f"{x:.1f},{y:.1f}")
+    # Coordinates are integers in a viewBox ten times the size, which keeps
+    # the path short without visible loss of precision.
+    scale = 10
+    paths = []
+    for i, values in enumerate(series):
+        color = colors[i % len(colors)]
+        d = _path(values, width, height, min_y, max_y, scale)
+        paths.append(f'<path stroke="{color}" d="{d}"/>')
 
     return (
         f'<svg width="{width}" height="{height}" class="sparkline" '
-        f'viewBox="0 0 {width} {height}" xmlns="http://www.w3.org/2000/svg">'
-        f'<polyline fill="none" stroke="{line_color}" stroke-width="{line_width}" '
-        f'points="{" ".join(points)}"/></svg>'
+        f'viewBox="0 0 {width * scale} {height * scale}" '
+        f'xmlns="http://www.w3.org/2000/svg">'
+        f'<g fill="none" stroke-width="{line_width * scale}">'
+        f'{"".join(paths)}</g></svg>'
     )
@@ -0,0 +1,267 @@
+"""
+TimeSeries
+----------
+
+Persistent numeric time series stored in a DictDB file.
+
+Samples are packed into fixed-duration binary blocks, one btree key per
+block, and minute, hour and day rollups (min/max/avg/count) are maintained as
+samples arrive, so long histories stay small and can be charted at whatever
+resolution fits the available pixels.
+
+Example:
+    >>> db = DictDB('sensors.db')
+    >>> temperature = TimeSeries(db, 'temperature')
+    >>> temperature.add(21.5)
+    >>> resolution, points = temperature.query(start, end, width=100)
+    >>> doc.sparkline([value for _t, value in points])
+"""
+
+import btree  # type: ignore
+import struct
+import time
+
+from .dictdb import RESERVED
+
+# Raw samples: milliseconds since the block start and the value.
+_SAMPLE = "<If"
+_SAMPLE_SIZE = struct.calcsize(_SAMPLE)
+# Rollup buckets: min, max, sum and count.
+_ROLLUP = "<ffdI"
+_BLOCK_START = ">I"
+
+
+class TimeSeries:
+    """A named series of (timestamp, value) samples in a DictDB.
+
+    Args:
+        db (DictDB): The database to store the series in. Its records live in
+            the reserved key space, so they never show up as regular keys.
+        name (str): Name of the series, unique within the database.
+        block_seconds (int): Duration covered by one block of raw samples.
+        flush_every (int): Number of samples buffered in memory before they
+            are written to the btree and flushed to disk.
+
+    Attributes:
+        RESOLUTIONS (tuple): Rollup bucket sizes in seconds.
+
+    Pending samples are lost on a crash, at most flush_every of them; call
+    flush() or close() to write them out explicitly. Reads include pending
+    samples without writing them. Samples may arrive out of order; each
+    block is kept sorted by time.
+    """
+
+    RESOLUTIONS = (60, 3600, 86400)
+
+    def __init__(self, db, name: str, block_seconds: int = 3600, flush_every=256):
+        self.db = db
+        self.name = name
+        self.block_seconds = block_seconds
+        self.flush_every = flush_every
+        self._prefix = RESERVED + b"ts:" + name.encode() + b":"
+        self._levels = {r: str(r).encode() + b":" for r in self.RESOLUTIONS}
+        self._block_start = None
+        self._block = None
+        self._last_ms = -1  # Offset of the newest sample in the block
+        self._unsorted = False
+        self._rollups = {}  # resolution -> [bucket start, min, max, sum, count]
+        self._pending = 0
+
+    def _key(self, level, start):
+        return self._prefix + level + struct.pack(_BLOCK_START, int(start))
+
+    def add(self, value: float, t: float = None) -> None:
+        """Record a sample, at time t (seconds, default now)."""
+        if t is None:
+            t = time.time()
+        block_start = int(t // self.block_seconds) * self.block_seconds
+        if block_start != self._block_start:
+            self._store_block()
+            self._block_start = block_start
+            self._block = bytearray(
+                self.db._get(self._key(b"r", block_start)) or b""
+            )
+            self._unsorted = False
+            self._last_ms = -1
+            if self._block:
+                self._last_ms = struct.unpack_from(
+                    _SAMPLE, self._block, len(self._block) - _SAMPLE_SIZE
+                )[0]
+        ms = int((t - block_start) * 1000)
+        if ms < self._last_ms:
+            self._unsorted = True
+        else:
+            self._last_ms = ms
+        self._block.extend(struct.pack(_SAMPLE, ms, value))
+
+        for resolution in self.RESOLUTIONS:
+            bucket_start = int(t // resolution) * resolution
+            bucket = self._rollups.get(resolution)
+            if bucket is None or bucket[0] != bucket_start:
+                self._store_rollup(resolution)
+                bucket = self._rollups[resolution] = self._load_rollup(
+                    resolution, bucket_start
+                )
+            if bucket[4] == 0 or value < bucket[1]:
+                bucket[1] = value
+            if bucket[4] == 0 or value > bucket[2]:
+                bucket[2] = value
+            bucket[3] += value
+            bucket[4] += 1
+
+        self._pending += 1
+        if self._pending >= self.flush_every:
+            self.flush()
+
+    def _sort_block(self):
+        # Out of order samples are sorted in memory once, before the block
+        # is read or stored, so stored blocks are always in time order.
+        if not self._unsorted:
+            return
+        block = self._block
+        records = [
+            struct.unpack_from(_SAMPLE, block, offset)
+            for offset in range(0, len(block), _SAMPLE_SIZE)
+        ]
+        records.sort(key=lambda record: record[0])
+        self._block = bytearray()
+        for ms, value in records:
+            self._block.extend(struct.pack(_SAMPLE, ms, value))
+        self._last_ms = records[-1][0]
+        self._unsorted = False
+
+    def _store_block(self):
+        if self._block is not None:
+            self._sort_block()
+            self.db._put(self._key(b"r", self._block_start), bytes(self._block))
+
+    def _load_rollup(self, resolution, bucket_start):
+        raw = self.db._get(self._key(self._levels[resolution], bucket_start))
+        if raw is None:
+            return [bucket_start, 0.0, 0.0, 0.0, 0]
+        return [bucket_start] + list(struct.unpack(_ROLLUP, raw))
+
+    def _store_rollup(self, resolution):
+        bucket = self._rollups.get(resolution)
+        if bucket is not None and bucket[4]:
+            key = self._key(self._levels[resolution], bucket[0])
+            self.db._put(key, struct.pack(_ROLLUP, *bucket[1:]))
+
+    def _store(self):
+        # One batch, so the database's flush policy sees a single write group.
+        with self.db.batch():
+            self._store_block()
+            for resolution in self._rollups:
+                self._store_rollup(resolution)
+
+    def flush(self) -> None:
+        """Write buffered samples and rollups, and flush them to disk."""
+        if not self._pending:
+            return
+        self._store()
+        self.db.commit()
+        self._pending = 0
+
+    def close(self) -> None:
+        """Flush buffered samples; the database itself stays open."""
+        self.flush()
+
+    def _merged(self, lo, hi, key, value):
+        # Yield the stored (key, value) records in [lo, hi], with the one
+        # held in memory, if any, taking the place of its stored copy.
+        if value is None or not lo <= key <= hi:
+            key = None
+        for stored_key, stored in self.db._scan(lo, hi, btree.INCL):
+            if key is not None and key <= stored_key:
+                yield key, value
+                if key == stored_key:
+                    key = None
+                    continue
+                key = None
+            yield stored_key, stored
+        if key is not None:
+            yield key, value
+
+    def samples(self, start: float, end: float):
+        """Yield raw (t, value) samples with start <= t <= end, oldest first."""
+        first = int(start // self.block_seconds) * self.block_seconds
+        lo = self._key(b"r", first)
+        hi = self._key(b"r", end)
+        size = _SAMPLE_SIZE
+        current = None
+        if self._block is not None:
+            self._sort_block()
+            current = self._key(b"r", self._block_start)
+        for key, block in self._merged(lo, hi, current, self._block):
+            block_start = struct.unpack(_BLOCK_START, key[-4:])[0]
+            for offset in range(0, len(block), size):
+                ms, value = struct.unpack_from(_SAMPLE, block, offset)
+                t = block_start + ms / 1000
+                if start <= t <= end:
+                    yield t, value
+
+    def rollups(self, start: float, end: float, resolution: int):
+        """Yield (t, min, max, avg, count) buckets of one resolution."""
+        if resolution not in self.RESOLUTIONS:
+            raise ValueError(f"{resolution} is not a rollup resolution")
+        level = self._levels[resolution]
+        first = int(start // resolution) * resolution
+        lo = self._key(level, first)
+        hi = self._key(level, end)
+        current = raw = None
+        bucket = self._rollups.get(resolution)
+        if bucket is not None and bucket[4]:
+            current = self._key(level, bucket[0])
+            raw = struct.pack(_ROLLUP, *bucket[1:])
+        for key, raw in self._merged(lo, hi, current, raw):
+            low, high, total, count = struct.unpack(_ROLLUP, raw)
+            bucket_start = struct.unpack(_BLOCK_START, key[-4:])[0]
+            yield bucket_start, low, high, total / count, count
+
+    def _decimated(self, start, end, width):
+        # Stream the samples into one time bucket per pixel, keeping only
+        # each bucket's lowest and highest sample, in time order.
+        scale = width / (end - start) if end > start else 0
+        buckets = []  # [pixel, lowest (t, value), highest (t, value)]
+        bucket = None
+        for sample in self.samples(start, end):
+            pixel = min(int((sample[0] - start) * scale), width - 1)
+            if bucket is None or bucket[0] != pixel:
+                bucket = [pixel, sample, sample]
+                buckets.append(bucket)
+            elif sample[1] < bucket[1][1]:
+                bucket[1] = sample
+            elif sample[1] > bucket[2][1]:
+                bucket[2] = sample
+        points = []
+        for _pixel, low, high in buckets:
+            if low is high:
+                points.append(low)
+            elif low[0] < high[0]:
+                points.extend((low, high))
+            else:
+                points.extend((high, low))
+        return points
+
+    def query(self, start: float, end: float, width: int = None):
+        """Return (resolution, [(t, value), ...]) suited to width pixels.
+
+        Uses raw samples while the finest rollup would be coarser than a
+        pixel, reduced to the lowest and highest sample of each pixel's
+        time span, otherwise the finest
+        rollup with at most two buckets per pixel (or the coarsest one).
+        Rollup values are bucket averages and resolution is None for raw
+        samples.
+        """
+        span = end - start
+        if width is None:
+            return None, list(self.samples(start, end))
+        if span / self.RESOLUTIONS[0] < width:
+            return None, self._decimated(start, end, width)
+        for resolution in self.RESOLUTIONS:
+            if span / resolution <= 2 * width:
+                break
+        points = [
+            (t, avg) for t, _l, _h, avg, _c in self.rollups(start, end, resolution)
+        ]
+        return resolution, points
@@ -6,9 +6,13 @@ require("ssl")
 include("lib")
 module("makeweb/__init__.py")
 module("makeweb/app.py")
+module("makeweb/cache.py")
+module("makeweb/codec.py")
 module("makeweb/constants.py")
 module("makeweb/dictdb.py")
 module("makeweb/html.py")
 module("makeweb/markdown.py")
+module("makeweb/ringbuffer.py")
 module("makeweb/sparkline.py")
+module("makeweb/timeseries.py")
 module("main.py")
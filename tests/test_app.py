@@ -0,0 +1,63 @@
+import asyncio
+import unittest
+from microdot.test_client import TestClient
+from makeweb.app import App
+
+
+class TestApp(unittest.TestCase):
+    def get(self, app, path):
+        return asyncio.run(TestClient(app).get(path))
+
+    def test_strict_follows_debug(self):
+        self.assertFalse(App().html().strict)
+        self.assertFalse(App().html_fragment("div").strict)
+        self.assertTrue(App(debug=True).html().strict)
+        self.assertTrue(App(debug=True).html_fragment("div").strict)
+
+    def test_page(self):
+        app = App()
+
+        @app.page("/")
+        def index(doc, request):
+            doc.h1("Hello & welcome")
+
+        response = self.get(app, "/")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.headers["Content-Type"], "text/html")
+        self.assertEqual(
+            response.text,
+            '<!DOCTYPE html><html lang="en"><h1>Hello &amp; welcome</h1></html>',
+        )
+
+    def test_page_not_streamed(self):
+        app = App(stream=False)
+
+        @app.page("/")
+        def index(doc, request):
+            doc.p("body")
+
+        response = self.get(app, "/")
+        self.assertEqual(response.headers["Content-Length"], str(len(response.body)))
+        self.assertEqual(
+            response.text, '<!DOCTYPE html><html lang="en"><p>body</p></html>'
+        )
+
+    def test_template(self):
+        app = App()
+
+        def layout(doc, slot):
+            doc.h1(slot("title"))
+
+        @app.template("/", layout)
+        def index(request):
+            return {"title": "<Home>"}
+
+        response = self.get(app, "/")
+        self.assertEqual(
+            response.text,
+            '<!DOCTYPE html><html lang="en"><h1>&lt;Home&gt;</h1></html>',
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,45 @@
+import unittest
+from makeweb.cache import LRUCache
+
+
+class TestLRUCache(unittest.TestCase):
+    def test_get_put(self):
+        cache = LRUCache(max_entries=10)
+        self.assertIsNone(cache.get("missing"))
+        cache.put("a", 1)
+        self.assertEqual(cache.get("a"), 1)
+        self.assertEqual((cache.hits, cache.misses), (1, 1))
+
+    def test_evicts_least_recently_used(self):
+        cache = LRUCache(max_entries=4)
+        for key in "abcd":
+            cache.put(key, key)
+        cache.get("a")
+        cache.put("e", "e")
+        self.assertTrue("a" in cache)
+        self.assertFalse("b" in cache)
+        self.assertTrue("e" in cache)
+        self.assertTrue(len(cache) <= 4)
+        self.assertTrue(cache.evictions >= 1)
+
+    def test_byte_budget(self):
+        cache = LRUCache(max_bytes=100)
+        cache.put("big", "x", size=101)
+        self.assertFalse("big" in cache)
+        cache.put("a", "x", size=60)
+        cache.put("b", "y", size=60)
+        self.assertFalse("a" in cache)
+        self.assertEqual(cache.size, 60)
+
+    def test_discard_and_replace(self):
+        cache = LRUCache(max_bytes=100)
+        cache.put("a", "x", size=10)
+        cache.put("a", "y", size=20)
+        self.assertEqual(cache.size, 20)
+        cache.discard("a")
+        self.assertEqual(cache.size, 0)
+        self.assertEqual(len(cache), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
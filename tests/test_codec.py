@@ -0,0 +1,134 @@
+import os
+import unittest
+
+from makeweb import BinaryCodec, DictDB, JSONCodec, KeyCodec
+from makeweb.codec import pack_ordered
+
+
+class TestCodec(unittest.TestCase):
+    values = [
+        None,
+        True,
+        False,
+        0,
+        -1,
+        127,
+        -33,
+        300,
+        -70000,
+        2**40,
+        1.5,
+        0.1,
+        "",
+        "short",
+        "long " * 100,
+        "ünïcode",
+        [],
+        [1, [2, 3]],
+        {"text": "milk", "completed": False},
+        {str(i): i for i in range(40)},
+        list(range(100)),
+    ]
+
+    def test_roundtrip(self):
+        codec = BinaryCodec()
+        for value in self.values:
+            self.assertEqual(codec.decode(codec.encode(value)), value)
+        self.assertEqual(codec.decode(codec.encode((1, "a"))), [1, "a"])
+        self.assertEqual(codec.decode(codec.encode(b"\x00\xff")), b"\x00\xff")
+
+    def test_compact(self):
+        codec = BinaryCodec()
+        self.assertEqual(codec.encode(5), b"\xc1\x05")
+        self.assertEqual(codec.encode("ab"), b"\xc1\xa2ab")
+        self.assertEqual(len(codec.encode(0.5)), 6)
+        # Beyond float32 range, floats fall back to 64 bits.
+        for value in (3.4028234663852886e38, 1e39, -1e300, float("inf")):
+            self.assertEqual(codec.decode(codec.encode(value)), value)
+        self.assertEqual(len(codec.encode(1e300)), 10)
+        record = {"text": "buy milk", "completed": False}
+        self.assertLess(len(codec.encode(record)), len(JSONCodec().encode(record)))
+
+    def test_codecs_read_each_other(self):
+        binary, text = BinaryCodec(), JSONCodec()
+        for value in self.values:
+            self.assertEqual(binary.decode(text.encode(value)), value)
+            self.assertEqual(text.decode(binary.encode(value)), value)
+
+    def test_unsupported(self):
+        with self.assertRaises(TypeError):
+            BinaryCodec().encode(object())
+        with self.assertRaises(ValueError):
+            BinaryCodec().encode(2**64)
+
+    def test_key_order(self):
+        codec = KeyCodec()
+        groups = [
+            [
+                -1e300, -(2**63), -70000, -256, -255.5, -1, -0.5, 0, 0.25, 1,
+                1.5, 255, 256, 2**60, 2**60 + 1, 2**63 - 1, 1e300,
+            ],
+            [(), (1,), (1, -5), (1, "a"), (1, "a\x00"), (1, "b"), (2,), ((1, 2), 3)],
+        ]
+        for keys in groups:
+            encoded = [codec.encode(key) for key in keys]
+            self.assertEqual(encoded, sorted(encoded))
+            for key in keys:
+                self.assertEqual(codec.decode(codec.encode(key)), key)
+        self.assertEqual(codec.encode("key"), b"key")
+        self.assertEqual(codec.decode("ünïcode".encode()), "ünïcode")
+        self.assertEqual(len(codec.encode(5)), 9)
+        # Numbers are keys by value, as in a dict.
+        self.assertEqual(codec.encode(2), codec.encode(2.0))
+        self.assertEqual(codec.decode(codec.encode(2.0)), 2)
+        self.assertEqual(codec.decode(codec.encode(2**63 - 1)), 2**63 - 1)
+        self.assertIsInstance(codec.decode(codec.encode(2.0**70)), float)
+        self.assertLess(codec.encode(2**63 - 1), codec.encode(2.0**63))
+
+    def test_ordered_numbers(self):
+        values = [
+            -1e300, -(2**63), -2.5, -1, 0, 0.5, 1, 1.5, 2, 2**53, 2**53 + 1,
+            2.0**60, 2**60 + 1, 2**63 - 1, 1e300,
+        ]
+        encoded = [pack_ordered(value) for value in values]
+        self.assertEqual(encoded, sorted(encoded))
+        self.assertEqual(len(set(encoded)), len(values))
+        self.assertEqual(pack_ordered(1), pack_ordered(1.0))
+        self.assertEqual(pack_ordered(0), pack_ordered(-0.0))
+        self.assertLess(pack_ordered(True), pack_ordered(-(2**63)))
+        self.assertLess(pack_ordered(1e300), pack_ordered(""))
+
+    def test_decode_fields(self):
+        codec = BinaryCodec()
+        record = {
+            "skip": [1, {"nested": "x" * 300}],
+            "blob": b"y" * 300,
+            "total": 12.5,
+            "city": "oslo",
+        }
+        raw = codec.encode(record)
+        self.assertEqual(codec.decode_fields(raw, ["city", "total"]), ["oslo", 12.5])
+        self.assertEqual(codec.decode_fields(raw, ["missing"], 0), [0])
+        self.assertEqual(codec.decode_fields(codec.encode([1]), ["city"]), [None])
+        self.assertEqual(
+            codec.decode_fields(JSONCodec().encode(dict(record, blob=None)), ["city"]),
+            ["oslo"],
+        )
+
+    def test_dictdb_reads_json_records(self):
+        filename = "test_codec.db"
+        db = DictDB(filename, codec=JSONCodec())
+        try:
+            db["old"] = {"n": 1}
+            db.close()
+            db = DictDB(filename)
+            db["new"] = {"n": 2}
+            self.assertEqual(dict(db.items()), {"old": {"n": 1}, "new": {"n": 2}})
+            self.assertEqual(db._get(b"new")[0], 0xC1)
+        finally:
+            db.close()
+            os.remove(filename)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,5 +1,7 @@
+import binascii
 import unittest
 import os
+import time
 from makeweb import DictDB
 
 class TestDictDB(unittest.TestCase):
@@ -9,10 +11,11 @@ class TestDictDB(unittest.TestCase):
     
     def tearDown(self):
         self.db.close()
-        try:
-            os.remove(self.db_file)
-        except OSError:
-            pass
+        for path in (self.db_file, self.db_file + ".wal"):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
     
     def test_basic_operations(self):
         # Test string values
@@ -146,6 +149,443 @@ class TestDictDB(unittest.TestCase):
         # Test non-existing key without default
         self.assertIsNone(self.db.get('nonexistent'))
 
+    def test_batch_defers_flush(self):
+        flushes = []
+        flush = self.db._db.flush
+        self.db._db.flush = lambda: flushes.append(1) or flush()
+        with self.db.batch():
+            with self.db.batch():
+                self.db['a'] = 1
+                self.db['b'] = 2
+            del self.db['a']
+            self.assertEqual(flushes, [])
+        self.assertEqual(flushes, [1])
+        self.assertEqual(self.db['b'], 2)
+
+    def test_flush_policies(self):
+        self.db.close()
+        db = DictDB(self.db_file, flush_every=3)
+        db['a'] = 1
+        db['b'] = 2
+        self.assertEqual(db._pending, 2)
+        db['c'] = 3
+        self.assertEqual(db._pending, 0)
+        db['d'] = 4
+        db.commit()
+        self.assertEqual(db._pending, 0)
+        db.close()
+
+        db = DictDB(self.db_file, flush_every=None, flush_ms=60000)
+        for i in range(10):
+            db[f'k{i}'] = i
+        self.assertEqual(db._pending, 10)
+        db.close()
+        self.db = DictDB(self.db_file)
+        self.assertEqual(self.db['k9'], 9)
+        self.assertEqual(self.db['d'], 4)
+
+    def test_flush_due(self):
+        self.db.close()
+        self.db = DictDB(self.db_file, flush_every=None, flush_ms=20)
+        self.assertFalse(self.db.flush_due())
+        self.db['a'] = 1
+        self.assertFalse(self.db.flush_due())
+        self.assertEqual(self.db._pending, 1)
+        time.sleep(0.03)
+        # Nothing is written in the meantime; an idle call flushes.
+        self.assertTrue(self.db.flush_due())
+        self.assertEqual(self.db._pending, 0)
+        self.assertFalse(self.db.flush_due())
+
+    def test_transaction_commit(self):
+        self.db['a'] = 1
+        self.db['b'] = 2
+        with self.db.transaction():
+            self.db['counter'] = 1
+            self.db['c'] = 3
+            del self.db['a']
+            with self.db.transaction():
+                self.db['d'] = 4
+            self.assertEqual(self.db['c'], 3)
+            self.assertNotIn('a', self.db)
+            self.assertEqual(
+                list(self.db.items()),
+                [('b', 2), ('c', 3), ('counter', 1), ('d', 4)]
+            )
+        self.assertEqual(list(self.db.keys()), ['b', 'c', 'counter', 'd'])
+        self.db.close()
+        self.db = DictDB(self.db_file)
+        self.assertEqual(list(self.db.values()), [2, 3, 1, 4])
+        self.assertFalse(os.path.exists(self.db_file + ".wal"))
+
+    def test_transaction_rollback_on_exception(self):
+        self.db['counter'] = 1
+        with self.assertRaises(ValueError):
+            with self.db.transaction():
+                self.db['counter'] = 2
+                self.db['entry'] = 'new'
+                raise ValueError()
+        self.assertEqual(self.db['counter'], 1)
+        self.assertNotIn('entry', self.db)
+        with self.assertRaises(KeyError):
+            with self.db.transaction():
+                del self.db['missing']
+
+    def test_keys_without_values(self):
+        for n in range(5):
+            self.db[f'k{n}'] = {'payload': 'x' * 100}
+        items = self.db._db.items
+
+        def no_values(*args):
+            raise AssertionError("values were read")
+
+        self.db._db.items = no_values
+        try:
+            self.assertEqual(list(self.db), ['k0', 'k1', 'k2', 'k3', 'k4'])
+            self.assertEqual(list(self.db.keys('k1', 'k3')), ['k1', 'k2', 'k3'])
+            self.assertEqual(
+                list(self.db.keys(reverse=True, limit=2)), ['k4', 'k3']
+            )
+            self.assertEqual(self.db.count(), 5)
+        finally:
+            self.db._db.items = items
+        with self.db.transaction():
+            del self.db['k0']
+            self.db['k9'] = 9
+            self.assertEqual(list(self.db), ['k1', 'k2', 'k3', 'k4', 'k9'])
+
+    def test_nested_transaction_failure_caught(self):
+        self.db['counter'] = 1
+        with self.db.transaction():
+            self.db['counter'] = 2
+            try:
+                with self.db.transaction():
+                    self.db['inner'] = True
+                    raise ValueError()
+            except ValueError:
+                pass
+            self.db['after'] = 'later'
+        self.assertEqual(self.db['counter'], 1)
+        self.assertNotIn('inner', self.db)
+        self.assertNotIn('after', self.db)
+        # The next transaction starts clean.
+        with self.db.transaction():
+            self.db['counter'] = 3
+        self.assertEqual(self.db['counter'], 3)
+
+    def test_log_recovery(self):
+        self.db.close()
+        db = DictDB(self.db_file, checkpoint_bytes=1 << 20)
+        with db.transaction():
+            db['a'] = 1
+            db['b'] = 2
+        with db.transaction():
+            del db['a']
+        with open(self.db_file + ".wal", "rb") as f:
+            log = f.read()
+        db.close()
+        os.remove(self.db_file)
+
+        # A torn transaction at the end of the log is ignored.
+        with open(self.db_file + ".wal", "wb") as f:
+            f.write(log + log[:20])
+        self.db = DictDB(self.db_file)
+        self.assertEqual(dict(self.db.items()), {'b': 2})
+        self.assertFalse(os.path.exists(self.db_file + ".wal"))
+
+    def test_value_cache(self):
+        self.db.close()
+        self.db = DictDB(self.db_file, cache_size=2)
+        self.db['config'] = {'tags': ['a']}
+        self.assertEqual(self.db['config'], {'tags': ['a']})
+        self.db['config']['tags'].append('b')
+        self.assertEqual(self.db['config'], {'tags': ['a']})
+        self.assertEqual(self.db.cache_info()['hits'], 2)
+        self.assertEqual(list(self.db.values()), [{'tags': ['a']}])
+
+        self.db['config'] = {'tags': []}
+        self.assertEqual(self.db['config'], {'tags': []})
+        del self.db['config']
+        self.assertIsNone(self.db.get('config'))
+
+        self.db['counter'] = 1
+        self.assertEqual(self.db['counter'], 1)
+        with self.assertRaises(ValueError):
+            with self.db.transaction():
+                self.db['counter'] = 2
+                self.assertEqual(self.db['counter'], 2)
+                raise ValueError()
+        self.assertEqual(self.db['counter'], 1)
+
+        for i in range(4):
+            self.db[f'k{i}'] = i
+            self.db[f'k{i}']
+        self.assertLessEqual(self.db.cache_info()['entries'], 2)
+        self.assertGreater(self.db.cache_info()['evictions'], 0)
+
+    def test_secondary_index(self):
+        self.db['t1'] = {'text': 'milk', 'completed': False, 'prio': 2}
+        self.db['t2'] = {'text': 'eggs', 'completed': True, 'prio': 1}
+        self.db.create_index('completed', 'completed')
+        self.db.create_index(
+            'prio', lambda v: v.get('prio') if isinstance(v, dict) else None
+        )
+        self.db['t3'] = {'text': 'bread', 'completed': False, 'prio': 3}
+        self.db['counter'] = 3
+
+        self.assertEqual(
+            [k for k, _v in self.db.find('completed', False)], ['t1', 't3']
+        )
+        self.assertEqual(list(self.db.find('completed', True)),
+                         [('t2', {'text': 'eggs', 'completed': True, 'prio': 1})])
+        self.assertEqual(
+            [k for k, _v in self.db.find_range('prio', 2)], ['t1', 't3']
+        )
+        self.assertEqual(
+            [k for k, _v in self.db.find_range('prio', 1, 3, incl=False)],
+            ['t2', 't1']
+        )
+
+        self.db['t1'] = {'text': 'milk', 'completed': True, 'prio': 2}
+        del self.db['t3']
+        self.assertEqual(list(self.db.find('completed', False)), [])
+        self.assertEqual(self.db.index_info('completed')['entries'], 2)
+        self.assertEqual(list(self.db.keys()), ['counter', 't1', 't2'])
+
+        with self.assertRaises(ValueError):
+            with self.db.transaction():
+                self.db['t4'] = {'text': 'jam', 'completed': False}
+                self.assertEqual(len(list(self.db.find('completed', False))), 1)
+                raise ValueError()
+        self.assertEqual(list(self.db.find('completed', False)), [])
+
+        # Indexes persist; reopening only needs the definition again.
+        self.db.close()
+        self.db = DictDB(self.db_file)
+        self.db.create_index('completed', 'completed')
+        self.assertEqual(len(list(self.db.find('completed', True))), 2)
+        self.db.rebuild_index('completed')
+        self.assertEqual(self.db.index_info('completed')['entries'], 2)
+        self.db.drop_index('completed')
+        self.assertEqual(self.db.index_info('completed')['entries'], 0)
+
+    def test_indexed_writes_follow_flush_policy(self):
+        self.db.close()
+        self.db = DictDB(self.db_file, flush_every=None)
+        self.db.create_index('completed', 'completed')
+        todos = self.db.collection('todos')
+        todos.create_index('completed', 'completed')
+        flushes = []
+        flush = self.db._db.flush
+        self.db._db.flush = lambda: flushes.append(1) or flush()
+        for n in range(10):
+            self.db[f't{n}'] = {'completed': False}
+            todos[n] = {'completed': n % 2 == 0}
+        del self.db['t0']
+        del todos[0]
+        self.assertEqual(flushes, [])
+        self.assertEqual(len(list(todos.find('completed', True))), 4)
+        self.db.commit()
+        self.assertEqual(flushes, [1])
+
+        self.db.flush_every = 5
+        for n in range(10):
+            todos[n] = {'completed': True}
+        # Index entries count as writes too, but a flush only happens once
+        # flush_every of them are pending, not on every record.
+        self.assertTrue(1 < len(flushes) < 11)
+
+    def test_index_mixed_numbers(self):
+        self.db.create_index('price', 'price')
+        prices = {'a': 1, 'b': 5.5, 'c': 10, 'd': 2.0, 'e': -0.5, 'f': 2**60 + 1}
+        for key, price in prices.items():
+            self.db[key] = {'price': price}
+        self.assertEqual(
+            [k for k, _v in self.db.find_range('price', 1, 10)], ['a', 'd', 'b', 'c']
+        )
+        self.assertEqual(
+            [k for k, _v in self.db.find_range('price', 1.5, 10, incl=False)],
+            ['d', 'b'],
+        )
+        self.assertEqual([k for k, _v in self.db.find('price', 1.0)], ['a'])
+        self.assertEqual([k for k, _v in self.db.find('price', 2)], ['d'])
+        self.assertEqual(
+            [k for k, _v in self.db.find_range('price', 2**60)], ['f']
+        )
+        self.assertEqual([k for k, _v in self.db.find('price', 2**60)], [])
+
+    def test_incr_and_append(self):
+        self.assertEqual(self.db.incr('hits'), 1)
+        self.assertEqual(self.db.incr('hits', 5), 6)
+        keys = [self.db.append('log:', {'n': i}) for i in range(12)]
+        self.assertEqual(keys[:2], ['log:a1', 'log:a2'])
+        self.assertEqual(keys[-1], 'log:b12')
+        self.assertEqual(list(self.db.keys()), keys)
+        self.assertEqual(self.db['log:b10'], {'n': 9})
+        with self.assertRaises(ValueError):
+            self.db.incr('hits', 0)
+
+        # Values keep increasing after reopening, skipping the rest of a block.
+        self.db.close()
+        self.db = DictDB(self.db_file)
+        self.assertGreater(self.db.incr('hits'), 6)
+        key = self.db.append('log:', 'next')
+        self.assertEqual(list(self.db.keys())[-1], key)
+
+    def test_incr_reserves_blocks(self):
+        flushes = []
+        flush = self.db._db.flush
+        self.db._db.flush = lambda: flushes.append(1) or flush()
+        for _ in range(DictDB.SEQUENCE_BLOCK * 2):
+            self.db.incr('id')
+        self.assertEqual(len(flushes), 2)
+
+    def test_reverse_limit_and_pages(self):
+        for k in 'abcde':
+            self.db[k] = k
+        self.assertEqual(list(self.db.keys(reverse=True)), list('edcba'))
+        self.assertEqual(list(self.db.keys('b', 'd', reverse=True)), list('dcb'))
+        self.assertEqual(
+            list(self.db.keys('b', 'd', incl=False, reverse=True)), ['c', 'b']
+        )
+        self.assertEqual(list(self.db.keys('bb', 'cc', reverse=True)), ['c'])
+        self.assertEqual(list(self.db.values(limit=2)), ['a', 'b'])
+        self.assertEqual(list(self.db.keys('c', limit=0)), [])
+
+        page, cursor = self.db.page(reverse=True, limit=2)
+        self.assertEqual(page, [('e', 'e'), ('d', 'd')])
+        page, cursor = self.db.page(reverse=True, limit=2, cursor=cursor)
+        self.assertEqual([k for k, _v in page], ['c', 'b'])
+        page, cursor = self.db.page(reverse=True, limit=2, cursor=cursor)
+        self.assertEqual(page, [('a', 'a')])
+        self.assertIsNone(cursor)
+
+        page, cursor = self.db.page('b', limit=2)
+        self.assertEqual([k for k, _v in page], ['b', 'c'])
+        self.assertEqual(list(self.db.keys(cursor=cursor)), ['d', 'e'])
+
+        for bad in ('zz', 'abc', 5):
+            with self.assertRaises(ValueError):
+                self.db.page(cursor=bad)
+        with self.assertRaises(ValueError):
+            self.db.page(limit=0)
+        # A crafted cursor can't reach outside the range.
+        todos = self.db.collection('todos')
+        todos['x'] = 1
+        outside = binascii.hexlify(b'a').decode()
+        self.assertEqual(todos.page(cursor=outside), ([('x', 1)], None))
+        self.assertEqual(todos.page(reverse=True, cursor='ffff'), ([('x', 1)], None))
+
+        with self.db.transaction():
+            self.db['cc'] = 1
+            del self.db['d']
+            self.assertEqual(
+                list(self.db.keys(reverse=True)), ['e', 'cc', 'c', 'b', 'a']
+            )
+
+    def test_typed_keys(self):
+        self.db['name'] = 'str keys still work'
+        for n in (1000000, 9, -3, 10):
+            self.db[n] = n
+        self.db[2.5] = 'float'
+        self.db[(7, 200)] = 'b'
+        self.db[(7, 100)] = 'a'
+        self.db[(8, 0)] = 'c'
+        self.assertEqual(
+            list(self.db.keys()),
+            ['name', -3, 2.5, 9, 10, 1000000, (7, 100), (7, 200), (8, 0)],
+        )
+        self.assertEqual(self.db[9], 9)
+        self.assertNotIn('9', self.db)
+        self.assertEqual(list(self.db.values((7,), (8,), incl=False)), ['a', 'b'])
+        self.assertEqual(list(self.db.keys(0, 100, reverse=True)), [10, 9, 2.5])
+        # Ints and floats interleave, and equal numbers are one key.
+        self.db[1] = 'one'
+        self.db[1.5] = 'one and a half'
+        self.assertEqual(list(self.db.keys(1, 2)), [1, 1.5])
+        self.assertEqual(self.db[1.0], 'one')
+        self.db[9.0] = 'nine'
+        self.assertEqual(self.db[9], 'nine')
+        del self.db[(7, 100)]
+        self.assertNotIn((7, 100), self.db)
+        with self.assertRaises(TypeError):
+            self.db[[1]] = 'lists are not keys'
+
+    def test_collections(self):
+        self.db['z'] = 'root'
+        todos = self.db.collection('todos')
+        sessions = self.db.collection('sessions')
+        self.assertIs(self.db.collection('todos'), todos)
+        for n in range(1, 6):
+            todos[n] = {'text': f'todo {n}', 'completed': n % 2 == 0}
+        sessions['abc'] = {'user': 1}
+
+        self.assertEqual(list(self.db.keys()), ['z'])
+        self.assertEqual(list(todos.keys()), [1, 2, 3, 4, 5])
+        self.assertEqual(list(todos.keys(reverse=True, limit=2)), [5, 4])
+        self.assertEqual(list(sessions.items()), [('abc', {'user': 1})])
+        self.assertEqual(list(sessions.keys(reverse=True)), ['abc'])
+        self.assertNotIn(1, self.db)
+        self.assertEqual(todos.count(), 5)
+        self.assertEqual(todos.count(2, 4, incl=False), 2)
+        self.assertEqual(self.db.count(), 1)
+
+        todos.create_index('completed', 'completed')
+        self.assertEqual([k for k, _v in todos.find('completed', True)], [2, 4])
+        self.assertEqual(todos.incr('id'), 1)
+        self.assertEqual(self.db.incr('id'), 1)
+
+        with self.db.transaction():
+            todos[6] = {'text': 'todo 6', 'completed': True}
+            sessions.clear()
+        self.assertEqual(sessions.count(), 0)
+        self.assertEqual(len(list(todos.find('completed', True))), 3)
+
+        todos.clear(1, 3)
+        self.assertEqual(list(todos.keys()), [4, 5, 6])
+        self.assertEqual(todos.index_info('completed')['entries'], 3)
+        self.db.clear()
+        self.assertEqual(self.db.count(), 0)
+        self.assertEqual(todos.count(), 3)
+
+    def test_count_and_aggregate(self):
+        orders = self.db.collection('orders')
+        for n, (city, total) in enumerate(
+            [('oslo', 10), ('rome', 5.5), ('oslo', 20), ('rome', 1), ('lima', 7)]
+        ):
+            orders[n] = {'city': city, 'total': total, 'notes': ['x'] * n}
+        orders[99] = {'city': 'oslo'}
+        self.db['legacy'] = 'not an order'
+
+        self.assertEqual(orders.count(), 6)
+        self.assertEqual(orders.count(1, 3), 3)
+        self.assertEqual(orders.count(limit=2), 2)
+        self.assertEqual(self.db.count(), 1)
+
+        self.assertEqual(
+            orders.aggregate('total'),
+            {'count': 6, 'sum': 43.5, 'min': 1, 'max': 20},
+        )
+        self.assertEqual(orders.aggregate('total', 0, 1)['sum'], 15.5)
+        self.assertEqual(orders.aggregate('total', limit=2)['count'], 2)
+        self.assertEqual(orders.aggregate(), {'count': 6})
+        self.assertEqual(
+            orders.aggregate('total', group_by='city'),
+            {
+                'oslo': {'count': 3, 'sum': 30, 'min': 10, 'max': 20},
+                'rome': {'count': 2, 'sum': 6.5, 'min': 1, 'max': 5.5},
+                'lima': {'count': 1, 'sum': 7, 'min': 7, 'max': 7},
+            },
+        )
+        self.assertEqual(
+            orders.aggregate(group_by='city'),
+            {'oslo': {'count': 3}, 'rome': {'count': 2}, 'lima': {'count': 1}},
+        )
+        self.assertEqual(
+            self.db.aggregate('total'),
+            {'count': 1, 'sum': 0, 'min': None, 'max': None},
+        )
+
 
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
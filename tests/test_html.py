@@ -1,5 +1,15 @@
+import os
 import unittest
-from makeweb.html import Html, HtmlFragment
+from makeweb.html import (
+    Frozen,
+    Html,
+    HtmlBuilder,
+    HtmlFragment,
+    Markup,
+    Template,
+    escape,
+    static,
+)
 
 DOCTYPE = "<!DOCTYPE html>"
 
@@ -233,6 +243,302 @@ class TestHtml(unittest.TestCase):
             DOCTYPE + '<html><nav><div class="fragment"><a href="#1">Link 1</a><a href="#2">Link 2</a></div></nav></html>'
         )
 
+    def test_iter_render_chunks(self):
+        doc = Html(lang="en")
+        with doc:
+            with doc.ul():
+                for i in range(200):
+                    doc.li(f"Entry {i}", cls="entry")
+        chunks = list(doc.iter_render(chunk_size=64))
+        self.assertTrue(len(chunks) > 1)
+        for chunk in chunks:
+            self.assertTrue(len(chunk) <= 64)
+        self.assertEqual(b"".join(chunks).decode(), str(doc))
+
+    def test_iter_render_large_part(self):
+        doc = Html()
+        with doc:
+            doc.style("p { color: red; }\n" * 500)
+            doc.p("after")
+        chunks = list(doc.iter_render(chunk_size=100))
+        self.assertTrue(all(len(chunk) == 100 for chunk in chunks[:-1]))
+        self.assertEqual(b"".join(chunks), doc.render_bytes())
+
+    def test_iter_render_fragment(self):
+        frag = HtmlFragment("nav")
+        frag.a("Home", href="/")
+        self.assertEqual(b"".join(frag.iter_render()).decode(), str(frag))
+
+    def test_render_into_nested(self):
+        doc = Html()
+        with doc.div(cls="outer"):
+            with doc.ul():
+                doc.li("one")
+                with doc.li():
+                    doc.span("two")
+                doc.li()
+        out = ["<!-- before -->"]
+        doc.render_into(out)
+        self.assertEqual("".join(out[1:]), doc.render())
+        self.assertEqual(
+            doc.render(),
+            DOCTYPE + '<html><div class="outer"><ul><li>one</li>'
+            "<li><span>two</span></li><li></li></ul></div></html>",
+        )
+
+    def test_render_into_escaped(self):
+        frag = HtmlFragment("p", title='"quoted"')
+        frag.add_child("<b>bold</b> & more")
+        frag.em("1 < 2")
+        out = []
+        frag.render_into(out)
+        self.assertEqual("".join(out), frag.render())
+        self.assertEqual(
+            frag.render(),
+            '<p title="&quot;quoted&quot;">&lt;b&gt;bold&lt;/b&gt; &amp; more'
+            "<em>1 &lt; 2</em></p>",
+        )
+
+    def test_render_into_void(self):
+        doc = Html()
+        with doc.div():
+            doc.br()
+            doc.img(src="a.png", alt="")
+            doc.p("after")
+        out = []
+        doc.root.render_into(out)
+        self.assertEqual("".join(out), doc.root.render())
+        self.assertEqual(
+            doc.root.render(),
+            '<html><div><br/><img alt="" src="a.png"/><p>after</p></div></html>',
+        )
+
+    def test_attributes_cache_invalidation(self):
+        doc = Html()
+        div = doc.div(cls="a", id="x")
+        self.assertEqual(str(doc), DOCTYPE + '<html><div class="a" id="x"></div></html>')
+        div.attrs["id"] = "y"
+        del div.attrs["class"]
+        self.assertEqual(str(doc), DOCTYPE + '<html><div id="y"></div></html>')
+
+    def test_attributes_shared_between_rows(self):
+        doc = Html()
+        first = doc.td("1", cls="cell", data_kind="n")
+        second = doc.td("2", cls="cell", data_kind="n")
+        doc.render()
+        self.assertIs(first._render_atts(), second._render_atts())
+
+    def test_attributes_bool_and_int_not_shared(self):
+        doc = Html()
+        doc.div(hidden=True)
+        doc.div(hidden=1)
+        self.assertEqual(
+            str(doc), DOCTYPE + '<html><div hidden></div><div hidden="1"></div></html>'
+        )
+
+    def test_compact_nodes(self):
+        doc = Html()
+        p = doc.p("text")
+        self.assertEqual(p.children, ["text"])
+        self.assertIsNone(p._attrs)
+        p.attrs["id"] = "late"
+        self.assertEqual(str(doc), DOCTYPE + '<html><p id="late">text</p></html>')
+
+    def test_precompiled_tag_methods(self):
+        self.assertTrue(hasattr(HtmlBuilder, "div"))
+        self.assertFalse(hasattr(HtmlBuilder, "blink"))
+        doc = Html()
+        doc.div("a")
+        self.assertEqual(str(doc), DOCTYPE + "<html><div>a</div></html>")
+
+    def test_non_strict_builder(self):
+        doc = Html()
+        doc.strict = False
+        with doc.ul():
+            doc.li("item", cls="row")
+        self.assertEqual(
+            str(doc), DOCTYPE + '<html><ul><li class="row">item</li></ul></html>'
+        )
+        with self.assertRaises(ValueError):
+            doc.blink()
+
+    def test_frozen_fragment_shared(self):
+        nav = HtmlFragment("nav")
+        nav.a("Home", href="/")
+        frozen = nav.freeze()
+        self.assertIsInstance(frozen, Frozen)
+        self.assertEqual(frozen.encoded, b'<nav><a href="/">Home</a></nav>')
+
+        pages = [Html(), Html()]
+        for page in pages:
+            with page:
+                with page.body():
+                    page.add_child(frozen)
+        for page in pages:
+            self.assertEqual(
+                str(page),
+                DOCTYPE + '<html><body><nav><a href="/">Home</a></nav></body></html>',
+            )
+
+    def test_frozen_element(self):
+        doc = Html()
+        with doc.ul() as ul:
+            doc.li("one")
+        self.assertEqual(ul.freeze().render(), "<ul><li>one</li></ul>")
+
+    def test_static_decorator(self):
+        calls = []
+
+        @static
+        def footer():
+            calls.append(1)
+            frag = HtmlFragment("footer")
+            frag.p("Bottom")
+            return frag
+
+        self.assertIs(footer(), footer())
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(str(footer()), "<footer><p>Bottom</p></footer>")
+
+    def test_template_slots(self):
+        def row(doc, slot):
+            doc.span(slot("text"), cls=slot("cls"))
+
+        def layout(doc, slot):
+            with doc:
+                doc.h1(slot("title"))
+                with doc.ul():
+                    doc.add_child(slot("items", Template(row, HtmlFragment("li"))))
+
+        page = Template(layout)
+        html = page.render(
+            title="Todo",
+            items=[{"text": "one", "cls": "a"}, {"text": "two", "cls": "b"}],
+        )
+        self.assertEqual(
+            html,
+            DOCTYPE
+            + '<html><h1>Todo</h1><ul><li><span class="a">one</span></li>'
+            + '<li><span class="b">two</span></li></ul></html>',
+        )
+
+    def test_template_fragment_values(self):
+        def layout(doc, slot):
+            doc.add_child(slot("body"))
+
+        frag = HtmlFragment("p")
+        frag.add_child("hi")
+        page = Template(layout, HtmlFragment("main"))
+        self.assertEqual(page.render({"body": frag}), "<main><p>hi</p></main>")
+        self.assertEqual(page.render({"body": 42}), "<main>42</main>")
+
+    def test_render_bytes(self):
+        nav = HtmlFragment("nav")
+        nav.a("Café", href="/")
+        doc = Html()
+        with doc:
+            doc.add_child(nav.freeze())
+            doc.p("naïve")
+        data = doc.render_bytes()
+        self.assertIsInstance(data, bytearray)
+        self.assertEqual(bytes(data), str(doc).encode())
+
+    def test_escape_clean_text_untouched(self):
+        text = "plain ascii text"
+        self.assertIs(escape(text), text)
+        markup = Markup("<b>bold</b>")
+        self.assertIs(escape(markup), markup)
+        self.assertEqual(
+            escape('<a href="x">&</a>'), "&lt;a href=&quot;x&quot;&gt;&amp;&lt;/a&gt;"
+        )
+        self.assertEqual(escape('"quoted"', False), '"quoted"')
+
+    def test_text_and_attributes_escaped(self):
+        doc = Html()
+        doc.p("1 < 2 & 3", title='say "hi"')
+        doc.div(Markup("<em>safe</em>"), " & more")
+        self.assertEqual(
+            str(doc),
+            DOCTYPE
+            + '<html><p title="say &quot;hi&quot;">1 &lt; 2 &amp; 3</p>'
+            + "<div><em>safe</em> &amp; more</div></html>",
+        )
+
+    def test_raw_text_elements_not_escaped(self):
+        doc = Html()
+        doc.style("a > b { color: red; }")
+        doc.script("if (a && b) {}")
+        self.assertEqual(
+            str(doc),
+            DOCTYPE
+            + "<html><style>a > b { color: red; }</style>"
+            + "<script>if (a && b) {}</script></html>",
+        )
+
+    def test_template_values_escaped(self):
+        def layout(doc, slot):
+            doc.a(slot("text"), href=slot("href"))
+
+        page = Template(layout, HtmlFragment("p"))
+        self.assertEqual(
+            page.render(text="<x>", href='/?a=1&b="2"'),
+            '<p><a href="/?a=1&amp;b=&quot;2&quot;">&lt;x&gt;</a></p>',
+        )
+        self.assertEqual(
+            page.render(text=Markup("<i>x</i>"), href="/"),
+            '<p><a href="/"><i>x</i></a></p>',
+        )
+
+        class Script:
+            def __str__(self):
+                return "<script>x</script>"
+
+        self.assertEqual(
+            page.render(text=Script(), href={"b": "<b>"}),
+            "<p><a href=\"{'b': '&lt;b&gt;'}\">&lt;script&gt;x&lt;/script&gt;</a></p>",
+        )
+        self.assertEqual(page.render(text=3, href="/"), '<p><a href="/">3</a></p>')
+
+    def test_inline_cached_and_revalidated(self):
+        path = "test_inline.css"
+        interval = HtmlBuilder.INLINE_CHECK_INTERVAL
+        try:
+            with open(path, "w") as f:
+                f.write("a > b {\n    color: red;\n}\n")
+            HtmlBuilder.INLINE_CHECK_INTERVAL = 60
+            first = Html()
+            first.inline("style", path)
+            self.assertEqual(
+                str(first),
+                DOCTYPE + "<html><style>a > b {\n    color: red;\n}\n</style></html>",
+            )
+
+            with open(path, "w") as f:
+                f.write("/* new */\np {\n    color: blue;\n}\n")
+            cached = Html()
+            cached.inline("style", path)
+            self.assertEqual(str(cached), str(first))
+
+            HtmlBuilder.INLINE_CHECK_INTERVAL = 0
+            fresh = Html()
+            fresh.inline("style", path)
+            self.assertTrue("blue" in str(fresh))
+
+            minified = Html()
+            minified.inline("style", path, minify=True)
+            self.assertEqual(
+                str(minified),
+                DOCTYPE + "<html><style>p {\ncolor: blue;\n}</style></html>",
+            )
+        finally:
+            HtmlBuilder.INLINE_CHECK_INTERVAL = interval
+            os.remove(path)
+
+    def test_inline_missing_file(self):
+        doc = Html()
+        doc.inline("style", "does-not-exist.css")
+        self.assertEqual(str(doc), DOCTYPE + "<html></html>")
+
 
 if __name__ == "__main__":
     unittest.main()
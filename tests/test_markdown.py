@@ -0,0 +1,104 @@
+import os
+import unittest
+from makeweb import markdown
+from makeweb.html import Frozen, HtmlFragment
+
+
+class TestMarkdown(unittest.TestCase):
+    def setUp(self):
+        markdown.cache.clear()
+
+    def test_parse_is_cached(self):
+        misses = markdown.cache.misses
+        hits = markdown.cache.hits
+        first = markdown.Markdown.parse("## Title")
+        second = markdown.Markdown.parse("## Title")
+        # Each call returns its own fragment around the same cached HTML.
+        self.assertIsInstance(first, HtmlFragment)
+        self.assertIsNot(first, second)
+        self.assertIsInstance(first.root.children[0], Frozen)
+        self.assertIs(first.root.children[0], second.root.children[0])
+        self.assertEqual(markdown.cache.misses, misses + 1)
+        self.assertEqual(markdown.cache.hits, hits + 1)
+        second.p("extra")
+        self.assertFalse("extra" in str(markdown.Markdown.parse("## Title")))
+        # Cached output is the same as a fresh rendering.
+        markdown.cache.clear()
+        fresh = markdown.Markdown.parse("## Title")
+        self.assertEqual(str(first), str(fresh))
+        self.assertTrue(str(fresh).startswith('<div class="markdown">'))
+
+    def test_fragment_markdown_dedents(self):
+        frag = HtmlFragment("section")
+        frag.markdown("""
+            ## Welcome
+            """)
+        self.assertEqual(str(frag), str(HtmlFragment("section").markdown("## Welcome")))
+        self.assertTrue("<h2>" in str(frag))
+
+    def test_markdown_file_sidecar(self):
+        path = "test_page.md"
+        try:
+            with open(path, "w") as f:
+                f.write("## First\n")
+            frag = HtmlFragment("article")
+            frag.markdown_file(path)
+            html = str(frag)
+            self.assertTrue(html.startswith('<article><div class="markdown">'))
+            self.assertTrue("First</h2>" in html)
+            with open(path + ".html") as f:
+                self.assertTrue(f.readline().startswith("<!-- makeweb"))
+
+            # A restart loses the memory cache but reuses the sidecar.
+            markdown.cache.clear()
+            self.assertEqual(
+                "<article>" + str(markdown.Markdown.parse_file(path)) + "</article>",
+                html,
+            )
+
+            with open(path, "w") as f:
+                f.write("## Second edition\n")
+            self.assertTrue("Second" in str(markdown.Markdown.parse_file(path)))
+        finally:
+            for name in (path, path + ".html"):
+                try:
+                    os.remove(name)
+                except OSError:
+                    pass
+
+    def test_markdown_file_read_only_directory(self):
+        folder = "test_readonly"
+        path = folder + "/page.md"
+        os.mkdir(folder)
+        try:
+            with open(path, "w") as f:
+                f.write("## Read only\n")
+            os.chmod(folder, 0o555)
+            if os.access(folder, os.W_OK):
+                self.skipTest("permissions are not enforced for this user")
+            frozen = markdown.Markdown.parse_file(path)
+            self.assertTrue(str(frozen).startswith('<div class="markdown">'))
+            self.assertTrue("Read only</h2>" in str(frozen))
+            self.assertEqual(os.listdir(folder), ["page.md"])
+            # The in-memory result is reused without another write attempt.
+            self.assertIs(markdown.Markdown.parse_file(path), frozen)
+        finally:
+            os.chmod(folder, 0o755)
+            for name in os.listdir(folder):
+                os.remove(folder + "/" + name)
+            os.rmdir(folder)
+
+    def test_markdown_file_sidecar_unwritable(self):
+        path = "test_page.md"
+        try:
+            with open(path, "w") as f:
+                f.write("## Fallback\n")
+            frozen = markdown.Markdown.parse_file(path, "missing/page.html")
+            self.assertTrue("Fallback</h2>" in str(frozen))
+            self.assertFalse(os.path.exists("missing"))
+        finally:
+            os.remove(path)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,39 @@
+import unittest
+from makeweb.ringbuffer import RingBuffer
+from makeweb.sparkline import create_sparkline
+
+
+class TestRingBuffer(unittest.TestCase):
+    def test_append_and_order(self):
+        buffer = RingBuffer(3)
+        for value in (1, 2, 3, 4, 5):
+            buffer.append(value)
+        self.assertEqual(len(buffer), 3)
+        self.assertEqual(list(buffer), [3.0, 4.0, 5.0])
+        self.assertEqual(buffer[0], 3.0)
+        self.assertEqual(buffer[-1], 5.0)
+        self.assertEqual(buffer[1:], [4.0, 5.0])
+        with self.assertRaises(IndexError):
+            buffer[3]
+
+    def test_running_stats(self):
+        buffer = RingBuffer(3, "d")
+        self.assertIsNone(buffer.mean)
+        for value in (1, 9, 2):
+            buffer.append(value)
+        self.assertEqual((buffer.min, buffer.max, buffer.mean), (1, 9, 4))
+        buffer.append(3)  # evicts the minimum
+        buffer.append(4)  # evicts the maximum
+        self.assertEqual((buffer.min, buffer.max, buffer.mean), (2, 4, 3))
+
+    def test_sparkline_accepts_buffer(self):
+        buffer = RingBuffer(10)
+        for value in range(10):
+            buffer.append(value)
+        self.assertEqual(
+            create_sparkline(buffer), create_sparkline([float(v) for v in range(10)])
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,34 @@
+import unittest
+from makeweb.sparkline import create_sparkline
+
+
+class TestSparkline(unittest.TestCase):
+    def test_empty(self):
+        self.assertEqual(create_sparkline([]), "")
+
+    def test_single_series(self):
+        svg = create_sparkline([0, 1], width=10, height=10)
+        self.assertTrue(svg.startswith('<svg width="10" height="10"'))
+        self.assertTrue('d="M0 100l100 -100"' in svg)
+
+    def test_multiple_series(self):
+        svg = create_sparkline([[1, 2, 3], [3, 2, 1]], line_color=["red", "blue"])
+        self.assertEqual(svg.count("<path "), 2)
+        self.assertTrue('stroke="red"' in svg)
+        self.assertTrue('stroke="blue"' in svg)
+
+    def test_decimation_keeps_extremes(self):
+        data = [0.0] * 100000
+        data[12345] = 10.0
+        data[54321] = -10.0
+        svg = create_sparkline(data, width=100, height=20)
+        d = svg.split(' d="')[1].split('"')[0]
+        points = len(d.split(" ")) // 2
+        self.assertTrue(points <= 200)
+        # The spike and the dip both reach the edges of the chart.
+        self.assertTrue("M0 100l" in d)
+        self.assertTrue(" -100" in d and " 100" in d)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,142 @@
+import os
+import unittest
+from makeweb import DictDB
+from makeweb.timeseries import TimeSeries
+
+T0 = 1700000000 - 1700000000 % 86400  # Start of a day
+
+
+class TestTimeSeries(unittest.TestCase):
+    def setUp(self):
+        self.db_file = "test_timeseries.db"
+        self.db = DictDB(self.db_file)
+
+    def tearDown(self):
+        self.db.close()
+        try:
+            os.remove(self.db_file)
+        except OSError:
+            pass
+
+    def test_samples_roundtrip(self):
+        series = TimeSeries(self.db, "temp", block_seconds=60)
+        for i in range(150):
+            series.add(float(i), T0 + i)
+        samples = list(series.samples(T0 + 50, T0 + 70))
+        self.assertEqual(len(samples), 21)
+        self.assertEqual(samples[0], (T0 + 50, 50.0))
+        self.assertEqual(samples[-1], (T0 + 70, 70.0))
+
+    def test_records_hidden_from_keys(self):
+        self.db["visible"] = 1
+        series = TimeSeries(self.db, "temp")
+        series.add(1.0, T0)
+        series.flush()
+        self.assertEqual(list(self.db.keys()), ["visible"])
+        self.assertEqual(list(self.db), ["visible"])
+
+    def test_rollups(self):
+        series = TimeSeries(self.db, "temp")
+        for i in range(180):
+            series.add(float(i % 60), T0 + i)
+        minutes = list(series.rollups(T0, T0 + 179, 60))
+        self.assertEqual(len(minutes), 3)
+        self.assertEqual(minutes[0], (T0, 0.0, 59.0, 29.5, 60))
+        hours = list(series.rollups(T0, T0 + 179, 3600))
+        self.assertEqual(hours, [(T0, 0.0, 59.0, 29.5, 180)])
+
+    def test_persisted_and_resumed(self):
+        series = TimeSeries(self.db, "temp")
+        series.add(1.0, T0)
+        series.add(3.0, T0 + 1)
+        series.flush()
+        self.db.close()
+        self.db = DictDB(self.db_file)
+        series = TimeSeries(self.db, "temp")
+        series.add(5.0, T0 + 2)
+        self.assertEqual(
+            [value for _t, value in series.samples(T0, T0 + 10)], [1.0, 3.0, 5.0]
+        )
+        self.assertEqual(list(series.rollups(T0, T0, 60)), [(T0, 1.0, 5.0, 3.0, 3)])
+
+    def test_query_resolution(self):
+        series = TimeSeries(self.db, "temp")
+        for i in range(0, 86400, 30):
+            series.add(1.0, T0 + i)
+        resolution, points = series.query(T0, T0 + 600, width=100)
+        self.assertIsNone(resolution)
+        self.assertEqual(len(points), 21)
+        resolution, points = series.query(T0, T0 + 86399, width=100)
+        self.assertEqual(resolution, 3600)
+        self.assertEqual(len(points), 24)
+
+    def test_reads_do_not_store(self):
+        series = TimeSeries(self.db, "temp", flush_every=1000)
+        series.add(1.0, T0)
+        series.add(2.0, T0 + 61)
+        key = series._key(b"r", T0)
+        self.assertIsNone(self.db._get(key))
+        self.assertEqual(
+            list(series.samples(T0, T0 + 100)), [(T0, 1.0), (T0 + 61, 2.0)]
+        )
+        self.assertEqual(
+            list(series.rollups(T0, T0 + 100, 60)),
+            [(T0, 1.0, 1.0, 1.0, 1), (T0 + 60, 2.0, 2.0, 2.0, 1)],
+        )
+        self.assertIsNone(self.db._get(key))
+        series.close()
+        self.assertIsNotNone(self.db._get(key))
+        self.assertEqual(len(list(series.rollups(T0, T0 + 100, 60))), 2)
+
+    def test_pending_block_merged_with_stored(self):
+        series = TimeSeries(self.db, "temp", block_seconds=60, flush_every=1000)
+        for i in range(0, 240, 30):
+            series.add(float(i), T0 + i)
+        series.add(5.0, T0 + 5)  # back into the first, already stored block
+        self.assertEqual(
+            [t - T0 for t, _v in series.samples(T0, T0 + 239)],
+            [0, 5, 30, 60, 90, 120, 150, 180, 210],
+        )
+
+    def test_out_of_order_samples_sorted(self):
+        series = TimeSeries(self.db, "temp", flush_every=1000)
+        for offset in (10, 30, 20, 0, 40):
+            series.add(float(offset), T0 + offset)
+        expected = [(T0 + i, float(i)) for i in (0, 10, 20, 30, 40)]
+        self.assertEqual(list(series.samples(T0, T0 + 60)), expected)
+        series.add(25.0, T0 + 25)
+        series.flush()
+        series = TimeSeries(self.db, "temp")
+        series.add(5.0, T0 + 5)
+        self.assertEqual(
+            [t - T0 for t, _v in series.samples(T0, T0 + 60)],
+            [0, 5, 10, 20, 25, 30, 40],
+        )
+
+    def test_in_order_samples_unchanged(self):
+        series = TimeSeries(self.db, "temp")
+        for i in range(10):
+            series.add(float(i), T0 + i)
+        self.assertFalse(series._unsorted)
+        self.assertEqual(
+            list(series.samples(T0, T0 + 9)), [(T0 + i, float(i)) for i in range(10)]
+        )
+
+    def test_query_raw_decimated(self):
+        series = TimeSeries(self.db, "temp")
+        for i in range(3000):
+            series.add(float(i % 7), T0 + i * 0.5)
+        resolution, points = series.query(T0, T0 + 1500, width=50)
+        self.assertIsNone(resolution)
+        self.assertTrue(len(points) <= 100)
+        self.assertEqual(points, sorted(points))
+        self.assertEqual(min(v for _t, v in points), 0.0)
+        self.assertEqual(max(v for _t, v in points), 6.0)
+        for pixel in range(50):
+            lo, hi = T0 + pixel * 30, T0 + (pixel + 1) * 30
+            self.assertTrue(len([t for t, _v in points if lo <= t < hi]) <= 2)
+        self.assertEqual(series.query(T0 + 1, T0 + 1, width=50), (None, [(T0 + 1, 2.0)]))
+
+
+if __name__ == "__main__":
+    unittest.main()
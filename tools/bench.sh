@@ -0,0 +1,7 @@
+#!/bin/sh
+
+for benchmark in benchmarks/*.py; do
+    [ "$benchmark" = "benchmarks/common.py" ] && continue
+    echo "== $benchmark"
+    MICROPYPATH="lib" makeweb "$benchmark"
+done